@@ -4,99 +4,316 @@ Prevents any duplicate alerts while maintaining signal accuracy
 """
 
 import os
+import mmap
+import atexit
+import asyncio
+import aiohttp
 import requests
-import json
+import orjson
 import time
-from datetime import datetime, timedelta
+import heapq
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 
+from utils import get_env, get_ist_time
+
+
+class JSONLStore:
+    """
+    Append-only JSON Lines store used by the alert caches
+    One record per line: writes are O(1) appends, loads are a single streaming scan
+    """
+    
+    DUMP_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.appends_since_compact = 0
+        self.logger = logging.getLogger(__name__)
+    
+    def read(self):
+        """Stream records from a read-only mmap of the file, skipping torn or malformed lines"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                size = len(mm)
+                while start < size:
+                    end = mm.find(b'\n', start)
+                    if end == -1:
+                        end = size
+                    try:
+                        yield orjson.loads(mm[start:end])
+                    except orjson.JSONDecodeError:
+                        pass
+                    start = end + 1
+    
+    def size(self):
+        """Current file size in bytes (0 if missing)"""
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+    
+    def _encode(self, records):
+        """Serialize records to newline-terminated JSON bytes"""
+        return b''.join(orjson.dumps(record, option=self.DUMP_OPTIONS) for record in records)
+    
+    def append(self, records):
+        """Append records to the end of the file"""
+        if not records:
+            return
+        with open(self.path, 'ab') as f:
+            f.write(self._encode(records))
+        self.appends_since_compact += len(records)
+    
+    def rewrite(self, records):
+        """Compact the file down to the given live records (atomic tmp-file + replace)"""
+        tmp_file = self.path.with_suffix('.tmp')
+        tmp_file.write_bytes(self._encode(records))
+        os.replace(tmp_file, self.path)
+        self.appends_since_compact = 0
+
+
+DEDUP_BUCKET_FIELDS = (('wt1', 'wt1_b'), ('wt2', 'wt2_b'), ('stoch_rsi_k', 'stoch_k_b'), ('stoch_rsi_d', 'stoch_d_b'))
+
+
+def bucket_dedup_value(value):
+    """Round an indicator value to the nearest 5 (dedup bucket)"""
+    return int(round(value / 5) * 5)
+
+
+def attach_dedup_buckets(signal):
+    """Pre-round dedup buckets onto a signal dict once, when the signal is created"""
+    for field, bucket_field in DEDUP_BUCKET_FIELDS:
+        signal[bucket_field] = bucket_dedup_value(signal.get(field, 0))
+    return signal
+
+
+@dataclass(frozen=True)
+class Signal:
+    """
+    Validated signal record for the deduplication fast path
+    Built once per signal so key/record code needs no .get() defaults or try/except
+    """
+    symbol: str
+    action: str
+    wt1: float
+    wt2: float
+    stoch_k: float
+    stoch_d: float
+    price: float
+    candle_ts: datetime
+    wt1_b: int
+    wt2_b: int
+    stoch_k_b: int
+    stoch_d_b: int
+    strength: float = 0.0
+    
+    @classmethod
+    def from_alert(cls, coin, signal):
+        """Coerce the pipeline's coin/signal dicts into a Signal (raises on bad input)"""
+        candle_ts = signal['candle_timestamp']
+        if isinstance(candle_ts, str):
+            candle_ts = datetime.fromisoformat(candle_ts.replace('Z', '+00:00'))
+        if 'wt1_b' not in signal:
+            signal = attach_dedup_buckets(dict(signal))
+        
+        return cls(
+            symbol=str(coin['symbol']).upper(),
+            action=str(signal['signal_type']).upper(),
+            wt1=float(signal.get('wt1', 0)),
+            wt2=float(signal.get('wt2', 0)),
+            stoch_k=float(signal.get('stoch_rsi_k', 0)),
+            stoch_d=float(signal.get('stoch_rsi_d', 0)),
+            price=float(coin.get('current_price', 0)),
+            candle_ts=candle_ts,
+            wt1_b=signal['wt1_b'],
+            wt2_b=signal['wt2_b'],
+            stoch_k_b=signal['stoch_k_b'],
+            stoch_d_b=signal['stoch_d_b'],
+            strength=float(signal.get('strength', 0)),
+        )
+
+
 class DeduplicationManager:
     """FIXED: Bulletproof deduplication preventing duplicate alerts"""
     
+    FLUSH_INTERVAL = 5.0  # Seconds between cache flushes to disk
+    COMPACT_EVERY = 500   # Appended records before the log is compacted
+    COMPACT_BYTES = 10 * 1024 * 1024  # Log size that triggers a compaction right after loading
+    DEDUP_WINDOW = 14400  # 4 hours - repeats inside this window are suppressed
+    MAX_ENTRIES = 10_000  # Hard LRU cap on in-memory (and compacted on-disk) entries
+    
     def __init__(self, cache_dir):
         self.cache_dir = Path(cache_dir)
-        self.cache_file = self.cache_dir / "deduplication_cache.json"
-        self.cache = {}
+        self.cache_file = self.cache_dir / "deduplication_cache.jsonl"
+        self.store = JSONLStore(self.cache_file)
+        self.cache = OrderedDict()
         self.logger = logging.getLogger(__name__)
-        self.load_cache()
+        self._expiry_heap = []  # (expiry_ts, key) min-heap for lazy eviction
+        self._pending = []
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._loaded = False  # Cache is read from disk on first use, not at startup
+        self._cycle_seen = set()  # (symbol, action) already emitted this cycle
+        
+        # Persist any pending entries on interpreter shutdown
+        atexit.register(self.close)
     
     def load_cache(self):
         """Load deduplication cache from disk"""
-        if self.cache_file.exists():
-            try:
-                cache_data = json.loads(self.cache_file.read_text())
-                # Clean old entries (older than 24 hours)
-                cutoff_time = datetime.utcnow() - timedelta(hours=24)
-                
-                self.cache = {
-                    key: data for key, data in cache_data.items()
-                    if datetime.fromisoformat(data.get('timestamp', '2000-01-01')) > cutoff_time
-                }
-                self.logger.info(f"Loaded {len(self.cache)} deduplication entries")
-            except Exception as e:
-                self.logger.error(f"Cache loading error: {e}")
-                self.cache = {}
-        else:
-            self.cache = {}
+        try:
+            # Keep entries still inside the dedup window; later lines override earlier ones
+            cutoff_ts = time.time() - self.DEDUP_WINDOW
+            self.cache = OrderedDict()
+            
+            for record in self.store.read():
+                key = record.pop('key', None)
+                if not isinstance(key, list):
+                    continue
+                if record.get('removed'):
+                    self.cache.pop(tuple(key), None)  # Tombstone written by unmark()
+                elif record.get('ts', 0) > cutoff_ts:
+                    self._lru_put(tuple(key), record)
+            
+            self._expiry_heap = [(data['ts'] + self.DEDUP_WINDOW, key) for key, data in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+            self.logger.info(f"Loaded {len(self.cache)} deduplication entries")
+        except Exception as e:
+            self.logger.error(f"Cache loading error: {e}")
+            self.cache = OrderedDict()
+            self._expiry_heap = []
+        self._loaded = True
+        
+        # A log bloated by expired/overridden lines is rewritten once instead of re-scanned every run
+        if self.store.size() > self.COMPACT_BYTES:
+            self.compact()
+    
+    def _ensure_loaded(self):
+        """Load the cache exactly once, on first real use"""
+        if not self._loaded:
+            self.load_cache()
     
     def save_cache(self):
-        """Save deduplication cache to disk"""
+        """Append pending entries to disk, compacting the log when it grows"""
         try:
-            self.cache_file.write_text(json.dumps(self.cache, indent=2))
+            self.store.append(self._pending)
+            self._pending = []
+            if self.store.appends_since_compact >= self.COMPACT_EVERY:
+                self.compact()
+            self._dirty = False
         except Exception as e:
             self.logger.error(f"Cache saving error: {e}")
+        finally:
+            self._last_flush = time.monotonic()
     
-    def create_cache_key(self, coin, signal):
-        """FIXED: Ultra-robust cache key preventing all duplicates"""
+    def compact(self):
+        """Rewrite the log with live entries only"""
+        if not self._loaded:
+            return  # Never compact over entries we have not read
         try:
-            symbol = coin['symbol'].upper()
-            action = signal['signal_type'].upper()
-            
-            # FIXED: Aggressive rounding to eliminate floating point issues
-            wt1_bucket = int(round(signal.get('wt1', 0) / 5) * 5)  # Round to nearest 5
-            wt2_bucket = int(round(signal.get('wt2', 0) / 5) * 5)  # Round to nearest 5
-            stoch_k_bucket = int(round(signal.get('stoch_rsi_k', 0) / 5) * 5)  # Round to nearest 5
-            stoch_d_bucket = int(round(signal.get('stoch_rsi_d', 0) / 5) * 5)  # Round to nearest 5
-            
-            # FIXED: Normalize candle timestamp to hourly buckets
-            candle_ts = signal.get('candle_timestamp')
-            if isinstance(candle_ts, str):
-                try:
-                    dt = datetime.fromisoformat(candle_ts.replace('Z', '+00:00'))
-                    hour_bucket = dt.strftime('%Y-%m-%d_%H:00')
-                except:
-                    hour_bucket = candle_ts[:13] + ':00'
-            else:
-                hour_bucket = candle_ts.strftime('%Y-%m-%d_%H:00')
-            
-            # Simple, reliable cache key
-            cache_key = f"{symbol}_{action}_{hour_bucket}_{wt1_bucket}_{wt2_bucket}_{stoch_k_bucket}_{stoch_d_bucket}"
-            return cache_key
-            
+            self.store.rewrite({'key': list(key), **data} for key, data in self.cache.items())
         except Exception as e:
-            self.logger.error(f"Cache key error: {e}")
-            return f"{coin.get('symbol', 'UNK')}_{signal.get('signal_type', 'UNK')}_{int(time.time() // 3600)}"
+            self.logger.error(f"Cache compaction error: {e}")
+    
+    def flush(self):
+        """Save cache only if there are unsaved entries"""
+        if self._dirty:
+            self.save_cache()
+    
+    def close(self):
+        """Flush pending entries and compact if anything was written this run"""
+        self.flush()
+        if self.store.appends_since_compact:
+            self.compact()
+    
+    def create_cache_key(self, record):
+        """FIXED: Ultra-robust cache key preventing all duplicates"""
+        # Hourly candle bucket + values pre-rounded to nearest 5 (kills float jitter)
+        # Plain tuple key: dicts hash tuples natively, no string building per lookup
+        return (
+            record.symbol,
+            record.action,
+            record.candle_ts.strftime('%Y-%m-%d_%H:00'),
+            record.wt1_b,
+            record.wt2_b,
+            record.stoch_k_b,
+            record.stoch_d_b,
+        )
+    
+    def format_key(self, cache_key):
+        """Human-readable form of a cache key for logging"""
+        return '|'.join(map(str, cache_key))
+    
+    def _lru_put(self, cache_key, record):
+        """Insert as most-recent entry, dropping the oldest beyond MAX_ENTRIES"""
+        self.cache[cache_key] = record
+        self.cache.move_to_end(cache_key)
+        if len(self.cache) > self.MAX_ENTRIES:
+            self.cache.popitem(last=False)
+    
+    def _evict_expired(self, now):
+        """Pop expired entries off the expiry heap - O(log n) per eviction"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, cache_key = heapq.heappop(heap)
+            entry = self.cache.get(cache_key)
+            # Skip stale heap entries for keys that were re-marked or unmarked since
+            if entry is not None and entry['ts'] + self.DEDUP_WINDOW <= now:
+                del self.cache[cache_key]
+                self.logger.info(f"🧹 Expired entry removed: {self.format_key(cache_key)}")
+    
+    def _is_duplicate_key(self, cache_key):
+        """Check a precomputed key against the cache after evicting expired entries"""
+        self._ensure_loaded()
+        self._evict_expired(time.time())
+        if cache_key in self.cache:
+            self.logger.info(f"🔄 Duplicate prevented: {self.format_key(cache_key)}")
+            return True
+        return False
+    
+    def _mark_key(self, cache_key, record):
+        """Record a precomputed key as sent and schedule it for persistence"""
+        self._ensure_loaded()
+        ts = int(time.time())
+        entry = {
+            'symbol': record.symbol,
+            'signal_type': record.action,
+            'ts': ts,
+            'wt1': record.wt1,
+            'wt2': record.wt2,
+            'stoch_k': record.stoch_k,
+            'stoch_d': record.stoch_d,
+            'price': record.price
+        }
+        self._lru_put(cache_key, entry)
+        heapq.heappush(self._expiry_heap, (ts + self.DEDUP_WINDOW, cache_key))
+        self._pending.append({'key': list(cache_key), **entry})
+        
+        # Batch writes: flush at most once per FLUSH_INTERVAL (atexit covers the rest)
+        self._dirty = True
+        if time.monotonic() - self._last_flush > self.FLUSH_INTERVAL:
+            self.save_cache()
+        self.logger.info(f"✅ Signal cached: {self.format_key(cache_key)}")
+    
+    def start_cycle(self):
+        """Reset the per-cycle fast path; call once at the start of each analysis cycle"""
+        self._cycle_seen.clear()
     
     def is_duplicate(self, coin, signal):
         """FIXED: Enhanced duplicate checking"""
         try:
-            cache_key = self.create_cache_key(coin, signal)
-            
-            if cache_key in self.cache:
-                cache_time_str = self.cache[cache_key].get('timestamp', '2000-01-01')
-                cache_time = datetime.fromisoformat(cache_time_str)
-                time_diff = datetime.utcnow() - cache_time
-                
-                if time_diff.total_seconds() < 14400:  # 4 hours
-                    self.logger.info(f"🔄 Duplicate prevented: {cache_key}")
-                    return True
-                else:
-                    del self.cache[cache_key]
-                    self.logger.info(f"🧹 Expired entry removed: {cache_key}")
-            
-            return False
-            
+            return self._is_duplicate_key(self.create_cache_key(Signal.from_alert(coin, signal)))
         except Exception as e:
             self.logger.error(f"Duplicate check error: {e}")
             return False
@@ -104,108 +321,87 @@ class DeduplicationManager:
     def mark_sent(self, coin, signal):
         """FIXED: Mark signal as sent"""
         try:
-            cache_key = self.create_cache_key(coin, signal)
-            
-            self.cache[cache_key] = {
-                'symbol': coin['symbol'],
-                'signal_type': signal['signal_type'],
-                'timestamp': datetime.utcnow().isoformat(),
-                'wt1': signal.get('wt1', 0),
-                'wt2': signal.get('wt2', 0),
-                'stoch_k': signal.get('stoch_rsi_k', 0),
-                'stoch_d': signal.get('stoch_rsi_d', 0),
-                'price': coin.get('current_price', 0)
-            }
-            
-            # Save immediately
-            self.save_cache()
-            self.logger.info(f"✅ Signal cached: {cache_key}")
-            
+            record = Signal.from_alert(coin, signal)
+            self._mark_key(self.create_cache_key(record), record)
         except Exception as e:
             self.logger.error(f"Mark sent error: {e}")
+    
+    def check_and_mark(self, coin, signal):
+        """
+        Duplicate check + mark with a single key computation
+        Returns True if the signal is a duplicate; otherwise marks it and returns False
+        """
+        try:
+            # Fast path: same symbol + action already emitted this cycle
+            cycle_key = (coin['symbol'], signal['signal_type'])
+            if cycle_key in self._cycle_seen:
+                return True
+            
+            record = Signal.from_alert(coin, signal)
+            cache_key = self.create_cache_key(record)
+            if self._is_duplicate_key(cache_key):
+                return True
+            self._mark_key(cache_key, record)
+            self._cycle_seen.add(cycle_key)
+            return False
+        except Exception as e:
+            self.logger.error(f"Duplicate check error: {e}")
+            return False
+    
+    def unmark(self, coin, signal):
+        """Release a signal marked by check_and_mark whose alert failed to send"""
+        try:
+            self._ensure_loaded()
+            self._cycle_seen.discard((coin['symbol'], signal['signal_type']))
+            cache_key = self.create_cache_key(Signal.from_alert(coin, signal))
+            if self.cache.pop(cache_key, None) is None:
+                return
+            pending_count = len(self._pending)
+            self._pending = [entry for entry in self._pending if tuple(entry['key']) != cache_key]
+            if len(self._pending) == pending_count:
+                # Reservation was already flushed: write a tombstone now so a crash before
+                # close() does not reload the unsent signal as sent
+                self.store.append([{'key': list(cache_key), 'removed': True}])
+        except Exception as e:
+            self.logger.error(f"Unmark error: {e}")
 
 class ChartURLResolver:
     """
-    Smart chart URL resolver with exchange fallback and caching
-    Tests actual URLs to ensure TradingView charts load properly
+    Chart URL resolver with static exchange priority
+    Picks the TradingView exchange from known market listings - no network probes
     """
     
-    def __init__(self, cache_dir):
-        self.cache_dir = Path(cache_dir)
-        self.cache_file = self.cache_dir / "chart_cache.json"
-        self.chart_cache = {}
-        self.logger = logging.getLogger(__name__)
-        self.load_cache()
+    FALLBACK_EXCHANGE = 'BYBIT'  # Best altcoin coverage on TradingView
     
-    def load_cache(self):
-        """Load chart URL cache"""
-        if self.cache_file.exists():
-            try:
-                cache_data = json.loads(self.cache_file.read_text())
-                # Keep cache entries that are less than 24 hours old
-                cutoff_time = datetime.utcnow() - timedelta(hours=24)
-                
-                self.chart_cache = {
-                    symbol: data for symbol, data in cache_data.items()
-                    if datetime.fromisoformat(data.get('timestamp', '2000-01-01')) > cutoff_time
-                }
-                self.logger.info(f"Loaded {len(self.chart_cache)} chart URL cache entries")
-            except Exception as e:
-                self.logger.error(f"Chart cache loading error: {e}")
-                self.chart_cache = {}
+    def __init__(self, exchange_map=None):
+        self.exchange_map = dict(exchange_map or {})
+        self.logger = logging.getLogger(__name__)
     
-    def save_cache(self):
-        """Save chart URL cache"""
-        try:
-            self.cache_file.write_text(json.dumps(self.chart_cache, indent=2))
-        except Exception as e:
-            self.logger.error(f"Chart cache saving error: {e}")
+    def set_exchange_map(self, exchange_map):
+        """Replace the {symbol: TradingView exchange} lookup table"""
+        self.exchange_map = dict(exchange_map)
+        self.logger.info(f"Chart exchange map loaded for {len(self.exchange_map)} symbols")
     
-    def test_chart_url(self, url):
-        """Test if TradingView chart URL actually works"""
-        try:
-            response = requests.head(url, timeout=3, allow_redirects=True)
-            return response.status_code == 200
-        except:
-            return False
+    def build_chart_url(self, symbol, exchange):
+        """Build TradingView chart URL for a USDT pair"""
+        return f"https://www.tradingview.com/chart/?symbol={exchange}:{symbol}USDT"
     
     def get_working_chart_url(self, symbol):
-        """Get working TradingView chart URL with smart fallback"""
-        # Check cache first
-        if symbol in self.chart_cache:
-            cached_data = self.chart_cache[symbol]
-            cache_age = datetime.utcnow() - datetime.fromisoformat(cached_data['timestamp'])
-            
-            if cache_age.total_seconds() < 86400:  # 24 hours
-                return cached_data['url'], cached_data['exchange']
-        
-        # Exchange priority list with correct URL formats
-        exchanges = [
-            ('BYBIT', f"https://www.tradingview.com/chart/?symbol=BYBIT:{symbol}USDT"),
-            ('BINANCE', f"https://www.tradingview.com/chart/?symbol=BINANCE:{symbol}USDT"),
-            ('OKX', f"https://www.tradingview.com/chart/?symbol=OKX:{symbol}USDT"),
-            ('COINBASE', f"https://www.tradingview.com/chart/?symbol=COINBASE:{symbol}USD"),
-        ]
-        
-        # Test each exchange
-        for exchange, url in exchanges:
-            if self.test_chart_url(url):
-                # Cache the working URL
-                self.chart_cache[symbol] = {
-                    'url': url,
-                    'exchange': exchange,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                
-                # Save cache periodically
-                if len(self.chart_cache) % 10 == 0:
-                    self.save_cache()
-                
-                return url, exchange
-        
-        # Force Bybit fallback (even if test fails, Bybit has best coverage)
-        fallback_url = f"https://www.tradingview.com/chart/?symbol=BYBIT:{symbol}USDT"
-        return fallback_url, "BYBIT"
+        """Get TradingView chart URL from the exchange map, falling back to Bybit"""
+        exchange = self.exchange_map.get(symbol, self.FALLBACK_EXCHANGE)
+        return self.build_chart_url(symbol, exchange), exchange
+
+
+# Alert formatting specs, selected with bisect_right over ascending thresholds
+PRICE_THRESHOLDS = (0.01, 1)
+PRICE_SPECS = ('${:.8f}', '${:.4f}', '${:,.2f}')
+CHANGE_SPECS = ('📉 {:.2f}%', '➡️ {:.2f}%', '📈 +{:.2f}%')  # indexed by sign + 1
+MARKET_CAP_THRESHOLDS = (100_000_000, 1_000_000_000)
+MARKET_CAP_SPECS = (
+    (1_000_000, '💎 Small Cap (${:.0f}M)'),
+    (1_000_000, '💎 Mid Cap (${:.0f}M)'),
+    (1_000_000_000, '🔷 Large Cap (${:.1f}B)')
+)
 
 
 class TelegramAlertManager:
@@ -214,55 +410,69 @@ class TelegramAlertManager:
     Handles dual-tier alerts with comprehensive signal information
     """
     
+    MAX_SEND_WORKERS = 8       # Concurrent sendMessage requests per batch
+    MIN_SEND_INTERVAL = 1 / 30  # Telegram global limit is ~30 messages/second
+    MAX_SEND_RETRIES = 2       # Retries per alert on 429 (after retry_after); 5xx may mean it was delivered
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
         # Load Telegram credentials
-        self.bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-        self.high_risk_chat_id = os.environ.get('HIGH_RISK_CHAT_ID')
-        self.standard_chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+        self.bot_token = get_env('TELEGRAM_BOT_TOKEN')
+        self.high_risk_chat_id = get_env('HIGH_RISK_CHAT_ID')
+        self.standard_chat_id = get_env('TELEGRAM_CHAT_ID')
         
         if not self.bot_token:
             self.logger.error("TELEGRAM_BOT_TOKEN not found in environment variables")
+        
+        # Keep-alive session for the single-alert send_alert() helper; the runners send batches
+        # through the shared aiohttp session below (get_http_session)
+        # sendMessage is not idempotent: retry only failed connects and 429 (Telegram did not accept
+        # the message); read errors and 5xx are left to the caller's unmark/next-cycle flow
+        self.session = requests.Session()
+        retries = Retry(total=2, connect=2, read=False, other=0, status=2, backoff_factor=0.3,
+                        status_forcelist=[429], allowed_methods=frozenset({'POST'}))
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries))
+        
+        # Tier-invariant message fragments, built once: (title template, urgency line)
+        self._tier_templates = {
+            "HIGH_RISK": ("{emoji} HIGH RISK SIGNAL {emoji}", "⚡ PREMIUM AUTHENTICATED SIGNAL ⚡"),
+            "STANDARD": ("{emoji} STANDARD SIGNAL {emoji}", "💎 QUALITY CONFIRMED SIGNAL 💎"),
+        }
+        self._tf_info = "📊 1H Heikin Ashi TrendPulse + 2H StochRSI"
+        
+        # aiohttp session for batch sends, created lazily on the running loop and reused across cycles
+        self._http_session = None
+        
+        # chat_id -> monotonic time before which Telegram asked us (429 retry_after) not to send
+        self._chat_resume_at = {}
     
     def get_ist_time(self):
-        """Get IST time in 12-hour format"""
-        from datetime import datetime, timedelta
-        utc = datetime.utcnow()
-        ist = utc + timedelta(hours=5, minutes=30)
-        return ist.strftime('%I:%M %p %d-%m-%Y'), ist.strftime('%A, %d %B %Y')
+        """Get IST time in 12-hour format (utils.get_ist_time memoizes the strings per minute)"""
+        ist = get_ist_time()
+        return ist['time_12h'], ist['date_str']
     
     def format_price(self, price):
         """Format price with appropriate precision"""
-        if price >= 1:
-            return f"${price:,.2f}"
-        elif price >= 0.01:
-            return f"${price:.4f}"
-        else:
-            return f"${price:.8f}"
+        return PRICE_SPECS[bisect_right(PRICE_THRESHOLDS, price)].format(price)
     
     def format_change(self, change):
         """Format price change with emoji"""
-        if change > 0:
-            return f"📈 +{change:.2f}%"
-        elif change < 0:
-            return f"📉 {change:.2f}%"
-        else:
-            return f"➡️ {change:.2f}%"
+        return CHANGE_SPECS[(change > 0) - (change < 0) + 1].format(change)
     
     def get_market_cap_category(self, coin):
         """Get market cap category with emoji"""
         market_cap = coin.get('market_cap', 0)
-        cap_billions = market_cap / 1_000_000_000
-        
-        if cap_billions >= 1:
-            return f"🔷 Large Cap (${cap_billions:.1f}B)"
-        else:
-            cap_millions = market_cap / 1_000_000
-            if cap_millions >= 100:
-                return f"💎 Mid Cap (${cap_millions:.0f}M)"
-            else:
-                return f"💎 Small Cap (${cap_millions:.0f}M)"
+        divisor, spec = MARKET_CAP_SPECS[bisect_right(MARKET_CAP_THRESHOLDS, market_cap)]
+        return spec.format(market_cap / divisor)
+    
+    def format_coin_view(self, coin):
+        """Format price, 24h change and market cap category for one coin"""
+        return (
+            self.format_price(coin['current_price']),
+            self.format_change(coin.get('price_change_24h', 0)),
+            self.get_market_cap_category(coin)
+        )
     
     def create_alert_message(self, coin, signal, tier_type):
         """Create premium alert message with all signal details"""
@@ -270,72 +480,69 @@ class TelegramAlertManager:
             action = signal['signal_type']
             action_emoji = '🟢' if action == 'BUY' else '🔴'
             
-            # Tier-specific formatting
-            if tier_type == "HIGH_RISK":
-                title = f"{action_emoji} HIGH RISK SIGNAL {action_emoji}"
-                timeframe_info = "📊 1H Heikin Ashi TrendPulse + 2H StochRSI"
-                urgency = "⚡ PREMIUM AUTHENTICATED SIGNAL ⚡"
-            else:
-                title = f"{action_emoji} STANDARD SIGNAL {action_emoji}"
-                timeframe_info = "📊 1H Heikin Ashi TrendPulse + 2H StochRSI"
-                urgency = "💎 QUALITY CONFIRMED SIGNAL 💎"
+            # Tier-specific formatting (precomputed in __init__)
+            title_tmpl, urgency = self._tier_templates.get(tier_type, self._tier_templates["STANDARD"])
             
             # Get formatted data
             time_str, date_str = self.get_ist_time()
-            price_str = self.format_price(coin['current_price'])
-            change_str = self.format_change(coin.get('price_change_24h', 0))
-            cap_category = self.get_market_cap_category(coin)
+            price_str, change_str, cap_category = self.format_coin_view(coin)
             
-            # Build comprehensive message
-            message = f"""{title}
-**{coin['symbol']}-USD — {action}**
-{cap_category}
-{urgency}
-
-💰 **Price**: {price_str}
-📊 **24h Change**: {change_str}
-📈 **TrendPulse**: WT1:{signal.get('wt1', 0):.2f} | WT2:{signal.get('wt2', 0):.2f}
-🎯 **StochRSI 2H**: K:{signal.get('stoch_rsi_k', 0):.1f} D:{signal.get('stoch_rsi_d', 0):.1f}
-💪 **Signal Strength**: {signal.get('strength', 0):.1f}
-✅ **Confirmation**: {signal.get('confirmation_reason', 'Authenticated')}
-🕐 **Time**: {time_str} IST
-📅 **Date**: {date_str}
-{timeframe_info}
-
-🔗 [**Live Chart**]({signal.get('chart_url', 'https://tradingview.com')})"""
-
-            return message
+            # Assemble only the dynamic lines around the static fragments
+            lines = (
+                title_tmpl.format(emoji=action_emoji),
+                f"**{coin['symbol']}-USD — {action}**",
+                cap_category,
+                urgency,
+                "",
+                f"💰 **Price**: {price_str}",
+                f"📊 **24h Change**: {change_str}",
+                f"📈 **TrendPulse**: WT1:{signal.get('wt1', 0):.2f} | WT2:{signal.get('wt2', 0):.2f}",
+                f"🎯 **StochRSI 2H**: K:{signal.get('stoch_rsi_k', 0):.1f} D:{signal.get('stoch_rsi_d', 0):.1f}",
+                f"💪 **Signal Strength**: {signal.get('strength', 0):.1f}",
+                f"✅ **Confirmation**: {signal.get('confirmation_reason', 'Authenticated')}",
+                f"🕐 **Time**: {time_str} IST",
+                f"📅 **Date**: {date_str}",
+                self._tf_info,
+                "",
+                f"🔗 [**Live Chart**]({signal.get('chart_url', 'https://tradingview.com')})",
+            )
+            return '\n'.join(lines)
             
         except Exception as e:
             self.logger.error(f"Message creation error: {e}")
             return f"Signal Alert: {coin.get('symbol', 'UNKNOWN')} {signal.get('signal_type', 'UNKNOWN')}"
     
+    def build_send_request(self, coin, signal, tier_type):
+        """(chat_id, sendMessage url, payload) for an alert, or None when credentials are missing"""
+        # Determine chat ID based on tier
+        if tier_type == "HIGH_RISK":
+            chat_id = self.high_risk_chat_id
+        else:
+            chat_id = self.standard_chat_id
+        
+        if not self.bot_token or not chat_id:
+            self.logger.error(f"Missing Telegram credentials for {tier_type}")
+            return None
+        
+        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        data = {
+            'chat_id': chat_id,
+            'text': self.create_alert_message(coin, signal, tier_type),
+            'parse_mode': 'Markdown',
+            'disable_web_page_preview': False
+        }
+        return chat_id, url, data
+    
     def send_alert(self, coin, signal, tier_type):
-        """Send alert to appropriate Telegram channel"""
+        """Send one alert synchronously (single-alert helper; batches go through send_alerts_batch_async)"""
         try:
-            # Determine chat ID based on tier
-            if tier_type == "HIGH_RISK":
-                chat_id = self.high_risk_chat_id
-            else:
-                chat_id = self.standard_chat_id
-            
-            if not self.bot_token or not chat_id:
-                self.logger.error(f"Missing Telegram credentials for {tier_type}")
+            request = self.build_send_request(coin, signal, tier_type)
+            if request is None:
                 return False
-            
-            # Create message
-            message = self.create_alert_message(coin, signal, tier_type)
+            _, url, data = request
             
             # Send to Telegram
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'Markdown',
-                'disable_web_page_preview': False
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
+            response = self.session.post(url, json=data, timeout=10)
             
             if response.status_code == 200:
                 self.logger.info(f"Alert sent successfully: {coin['symbol']} {signal['signal_type']}")
@@ -347,3 +554,82 @@ class TelegramAlertManager:
         except Exception as e:
             self.logger.error(f"Alert sending error: {e}")
             return False
+    
+    async def _wait_for_chat(self, chat_id):
+        """Sleep out a retry_after window Telegram imposed on this chat (other chats keep sending)"""
+        delay = self._chat_resume_at.get(chat_id, 0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    async def send_alert_async(self, session, coin, signal, tier_type, delay=0):
+        """Coroutine version of send_alert(); delay staggers the start to respect the global limit"""
+        try:
+            request = self.build_send_request(coin, signal, tier_type)
+            if request is None:
+                return False
+            chat_id, url, data = request
+            
+            await asyncio.sleep(delay)
+            for attempt in range(self.MAX_SEND_RETRIES + 1):
+                await self._wait_for_chat(chat_id)
+                async with session.post(url, json=data) as response:
+                    if response.status == 200:
+                        self.logger.info(f"Alert sent successfully: {coin['symbol']} {signal['signal_type']}")
+                        return True
+                    
+                    body = await response.read()
+                    if response.status == 429 and attempt < self.MAX_SEND_RETRIES:
+                        retry_after = orjson.loads(body).get('parameters', {}).get('retry_after', 1)
+                        self._chat_resume_at[chat_id] = time.monotonic() + retry_after
+                        continue
+                    
+                    self.logger.error(f"Telegram API error {response.status}: {body[:100].decode(errors='replace')}")
+                    return False
+            
+        except Exception as e:
+            self.logger.error(f"Alert sending error: {e}")
+            return False
+    
+    async def get_http_session(self):
+        """
+        Shared aiohttp session, created on first use on the running loop
+        Reused by later batches on the same loop so keep-alive connections survive between cycles
+        """
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.MAX_SEND_WORKERS),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http_session
+    
+    async def close_async(self):
+        """Close the shared aiohttp session (on the loop that created it)"""
+        session, self._http_session = self._http_session, None
+        if session is not None:
+            await session.close()
+    
+    async def send_alerts_batch_async(self, items):
+        """Send (coin, signal, tier_type) alerts on the shared aiohttp session; flags keep item order"""
+        if not items:
+            return []
+        session = await self.get_http_session()
+        return await asyncio.gather(*(
+            self.send_alert_async(session, coin, signal, tier_type, delay=i * self.MIN_SEND_INTERVAL)
+            for i, (coin, signal, tier_type) in enumerate(items)
+        ))
+    
+    def send_alerts_batch(self, items):
+        """
+        Send a batch of (coin, signal, tier_type) alerts concurrently on a throwaway event loop
+        Returns success flags in the same order as items; for one-shot callers (main_scheduled)
+        """
+        if not items:
+            return []
+        
+        async def send_once():
+            try:
+                return await self.send_alerts_batch_async(items)
+            finally:
+                await self.close_async()
+        
+        return asyncio.run(send_once())
@@ -7,6 +7,270 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
+import threading
+from collections import deque, namedtuple
+from dataclasses import dataclass
+from numba import njit, prange
+
+from utils import INDICATOR_DTYPE
+
+
+@njit(cache=True, nogil=True)
+def _ewma_adjust_false(x, alpha):
+    """
+    EWMA matching pandas ewm(alpha=alpha, adjust=False).mean(); seeded at the first non-NaN value
+    Mid-series NaNs are handled like pandas (ignore_na=False): the previous value's weight keeps
+    decaying across the gap, so the next observation is weighted by the gap length
+    """
+    n = x.shape[0]
+    y = np.empty_like(x)
+    y[:] = np.nan
+    start = 0
+    while start < n and np.isnan(x[start]):
+        start += 1
+    if start == n:
+        return y
+    weighted = x[start]
+    old_wt = 1.0
+    y[start] = weighted
+    for i in range(start + 1, n):
+        old_wt *= 1.0 - alpha
+        if not np.isnan(x[i]):
+            if weighted != x[i]:
+                weighted = (old_wt * weighted + alpha * x[i]) / (old_wt + alpha)
+            old_wt = 1.0
+        y[i] = weighted
+    return y
+
+
+@njit(cache=True, nogil=True)
+def _sma(x, length):
+    """Trailing simple moving average; first length-1 values are NaN like pandas rolling().mean()"""
+    n = x.shape[0]
+    y = np.empty_like(x)
+    y[:] = np.nan
+    for i in range(length - 1, n):
+        total = 0.0
+        for j in range(i - length + 1, i + 1):
+            total += x[j]
+        y[i] = total / length
+    return y
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _wave_trend_batch(hlc3_2d, ch_len, avg_len, smooth_len):
+    """
+    TrendPulse wt1/wt2 for many coins at once, one row per coin (threads over rows)
+    Returns current and previous closed-candle wt1/wt2 arrays
+    """
+    n_coins, n_bars = hlc3_2d.shape
+    alpha_ch = 2.0 / (ch_len + 1)
+    alpha_avg = 2.0 / (avg_len + 1)
+    wt1_curr = np.full(n_coins, np.nan)
+    wt2_curr = np.full(n_coins, np.nan)
+    wt1_prev = np.full(n_coins, np.nan)
+    wt2_prev = np.full(n_coins, np.nan)
+    if n_bars < 3:
+        return wt1_curr, wt2_curr, wt1_prev, wt2_prev
+    
+    for r in prange(n_coins):
+        hlc3 = hlc3_2d[r]
+        esa = _ewma_adjust_false(hlc3, alpha_ch)
+        diff = hlc3 - esa
+        dev = _ewma_adjust_false(np.abs(diff), alpha_ch)
+        ci = np.empty_like(hlc3)
+        for i in range(n_bars):
+            dev_safe = dev[i] if dev[i] != 0 else 0.001
+            ci[i] = diff[i] / (0.015 * dev_safe)
+        wt1 = _ewma_adjust_false(ci, alpha_avg)
+        wt2 = _sma(wt1, smooth_len)
+        wt1_curr[r] = wt1[n_bars - 2]
+        wt2_curr[r] = wt2[n_bars - 2]
+        wt1_prev[r] = wt1[n_bars - 3]
+        wt2_prev[r] = wt2[n_bars - 3]
+    
+    return wt1_curr, wt2_curr, wt1_prev, wt2_prev
+
+
+@njit(cache=True, nogil=True)
+def _rsi_sma(close, period):
+    """
+    Single-pass RSI with simple-average gains/losses (same as rolling(period).mean())
+    Window sums are taken directly so an all-gain window keeps an exact zero loss
+    """
+    n = close.shape[0]
+    gain = np.zeros_like(close)
+    loss = np.zeros_like(close)
+    rsi = np.empty_like(close)
+    rsi[:] = np.nan
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        if delta > 0:
+            gain[i] = delta
+        elif delta < 0:
+            loss[i] = -delta
+    for i in range(period - 1, n):
+        sum_gain = 0.0
+        sum_loss = 0.0
+        for j in range(i - period + 1, i + 1):
+            sum_gain += gain[j]
+            sum_loss += loss[j]
+        avg_gain = sum_gain / period
+        avg_loss = sum_loss / period
+        if avg_loss == 0:
+            avg_loss = 1e-10  # Avoid division by zero
+        rsi[i] = 100 - (100 / (1 + avg_gain / avg_loss))
+    return rsi
+
+
+@njit(cache=True, nogil=True)
+def _stochrsi(close, rsi_period, stoch_period, k_smooth, d_smooth):
+    """
+    Fused StochRSI: RSI -> rolling min/max -> %K -> %D without intermediate Series
+    Returns the last two K and D values (NaN where a window is not yet full)
+    """
+    rsi = _rsi_sma(close, rsi_period)
+    n = rsi.shape[0]
+    first = rsi_period - 1  # First non-NaN RSI
+    
+    # Rolling min/max of RSI via monotonic deques of indices (O(1) amortized)
+    stoch = np.empty_like(rsi)
+    stoch[:] = np.nan
+    min_q = np.empty(n, np.int64)
+    max_q = np.empty(n, np.int64)
+    min_head = min_tail = max_head = max_tail = 0
+    for i in range(first, n):
+        value = rsi[i]
+        while min_tail > min_head and rsi[min_q[min_tail - 1]] >= value:
+            min_tail -= 1
+        min_q[min_tail] = i
+        min_tail += 1
+        while max_tail > max_head and rsi[max_q[max_tail - 1]] <= value:
+            max_tail -= 1
+        max_q[max_tail] = i
+        max_tail += 1
+        
+        start = i - stoch_period + 1
+        if min_q[min_head] < start:
+            min_head += 1
+        if max_q[max_head] < start:
+            max_head += 1
+        if start >= first:
+            rsi_min = rsi[min_q[min_head]]
+            rsi_range = rsi[max_q[max_head]] - rsi_min
+            if rsi_range == 0:
+                rsi_range = 1e-10  # Avoid division by zero
+            stoch[i] = ((value - rsi_min) / rsi_range) * 100
+    
+    # %K = SMA(stoch, k_smooth) and %D = SMA(%K, d_smooth) in one pass
+    k = np.empty_like(rsi)
+    k[:] = np.nan
+    d = np.empty_like(rsi)
+    d[:] = np.nan
+    k_start = first + stoch_period - 1 + k_smooth - 1
+    d_start = k_start + d_smooth - 1
+    for i in range(k_start, n):
+        total = 0.0
+        for j in range(i - k_smooth + 1, i + 1):
+            total += stoch[j]
+        k[i] = total / k_smooth
+        if i >= d_start:
+            total = 0.0
+            for j in range(i - d_smooth + 1, i + 1):
+                total += k[j]
+            d[i] = total / d_smooth
+    
+    return k[-2:], d[-2:]
+
+
+@njit(cache=True, nogil=True)
+def _heikin_ashi(o, h, l, c, first_open, series_start):
+    """Single pass over OHLC writing HA close/open/high/low/hlc3"""
+    n = c.shape[0]
+    ha_close = np.empty_like(c)
+    ha_open = np.empty_like(c)
+    ha_high = np.empty_like(c)
+    ha_low = np.empty_like(c)
+    ha_hlc3 = np.empty_like(c)
+    
+    for i in range(n):
+        # HA Close = (O + H + L + C) / 4
+        ha_close[i] = (o[i] + h[i] + l[i] + c[i]) / 4.0
+        
+        # HA Open = (prev HA Open + prev HA Close) / 2
+        if i == 0:
+            ha_open[i] = first_open
+        else:
+            ha_open[i] = (ha_open[i - 1] + ha_close[i - 1]) / 2.0
+        
+        # HA High/Low = max/min(H/L, HA Open, HA Close); first candle of a series keeps raw H/L
+        if i == 0 and series_start:
+            ha_high[i] = h[i]
+            ha_low[i] = l[i]
+        else:
+            ha_high[i] = max(h[i], ha_open[i], ha_close[i])
+            ha_low[i] = min(l[i], ha_open[i], ha_close[i])
+        
+        ha_hlc3[i] = (ha_high[i] + ha_low[i] + ha_close[i]) / 3.0
+    
+    return ha_close, ha_open, ha_high, ha_low, ha_hlc3
+
+
+def heikin_ashi_arrays(o, h, l, c, first_open=None):
+    """
+    Heikin Ashi (close, open, high, low, hlc3) arrays from raw OHLC arrays
+    first_open seeds HA Open when continuing a series; None means o[0] is the first candle
+    """
+    series_start = first_open is None
+    if series_start:
+        first_open = (o[0] + c[0]) / 2.0
+    return _heikin_ashi(o, h, l, c, first_open, series_start)
+
+
+@dataclass(frozen=True)
+class Candles:
+    """
+    OHLCV candles as parallel arrays (structure of arrays)
+    ts holds int64 open times in ms; prices and volume use INDICATOR_DTYPE
+    """
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    
+    @classmethod
+    def from_ohlcv(cls, ohlcv):
+        """Split (n, 6) [timestamp_ms, O, H, L, C, V] rows into contiguous columns"""
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        values = np.ascontiguousarray(ohlcv[:, 1:].T, dtype=INDICATOR_DTYPE)
+        return cls(ohlcv[:, 0].astype(np.int64), *values)
+    
+    def __len__(self):
+        return len(self.ts)
+    
+    def timestamp(self, i):
+        """Candle i's open time as a pandas Timestamp (for alerts and dedup keys)"""
+        return pd.Timestamp(int(self.ts[i]), unit='ms')
+
+
+@dataclass(frozen=True)
+class HeikinAshiCandles:
+    """Heikin Ashi columns aligned with the source Candles.ts"""
+    ts: np.ndarray
+    ha_close: np.ndarray
+    ha_open: np.ndarray
+    ha_high: np.ndarray
+    ha_low: np.ndarray
+    ha_hlc3: np.ndarray
+    
+    def __len__(self):
+        return len(self.ts)
+    
+    def timestamp(self, i):
+        """Candle i's open time as a pandas Timestamp (for alerts and dedup keys)"""
+        return pd.Timestamp(int(self.ts[i]), unit='ms')
 
 
 class HeikinAshiConverter:
@@ -17,97 +281,261 @@ class HeikinAshiConverter:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        
+        # Last HA frame per (symbol, timeframe) so only newly arrived candles are converted
+        self._last_ha = {}
+        self._last_ha_candles = {}  # Same, for the Candles (array) path
+    
+    def _ha_frame(self, df, first_open=None):
+        """Vectorized HA columns for df; first_open=None when df starts the series"""
+        o, h, l, c = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=INDICATOR_DTYPE).T
+        ha_close, ha_open, ha_high, ha_low, ha_hlc3 = heikin_ashi_arrays(o, h, l, c, first_open)
+        
+        # Only the HA columns are allocated; raw OHLCV is shared with df (copy-on-write)
+        ha_columns = pd.DataFrame({
+            'HA_Close': ha_close,
+            'HA_Open': ha_open,
+            'HA_High': ha_high,
+            'HA_Low': ha_low,
+            'HA_HLC3': ha_hlc3
+        }, index=df.index)
+        return pd.concat([df, ha_columns], axis=1)
+    
+    def _convert_incremental(self, df, cached):
+        """
+        Reuse cached HA rows up to the last candle that was closed at the previous call
+        Returns None when df does not line up with the cache (full conversion needed)
+        """
+        if cached is None or len(cached) < 2:
+            return None
+        
+        anchor = cached.index[-2]  # Cached in-progress candle (-1) is always recomputed
+        if df.index[0] not in cached.index or anchor not in df.index:
+            return None
+        pos = df.index.get_loc(anchor)
+        kept = cached.loc[df.index[0]:anchor]
+        if not isinstance(pos, (int, np.integer)) or len(kept) != pos + 1:
+            return None
+        
+        new_rows = df.iloc[pos + 1:]
+        if new_rows.empty:
+            return kept
+        
+        first_open = (cached.at[anchor, 'HA_Open'] + cached.at[anchor, 'HA_Close']) / 2.0
+        return pd.concat([kept, self._ha_frame(new_rows, first_open)])
     
-    def convert(self, df):
-        """Convert regular OHLC DataFrame to Heikin Ashi"""
+    def convert(self, df, state_key=None):
+        """
+        Convert regular OHLC DataFrame to Heikin Ashi
+        state_key (e.g. (symbol, '1h')) enables incremental updates across calls
+        """
         if df is None or len(df) < 2:
             return None
         
         try:
-            ha_df = df.copy()
-            
-            # Initialize Heikin Ashi columns
-            ha_df['HA_Close'] = 0.0
-            ha_df['HA_Open'] = 0.0
-            ha_df['HA_High'] = 0.0
-            ha_df['HA_Low'] = 0.0
+            ha_df = None
+            if state_key is not None:
+                ha_df = self._convert_incremental(df, self._last_ha.get(state_key))
             
-            # Calculate first Heikin Ashi candle
-            first_idx = ha_df.index[0]
-            ha_df.loc[first_idx, 'HA_Close'] = (
-                df.loc[first_idx, 'Open'] + df.loc[first_idx, 'High'] + 
-                df.loc[first_idx, 'Low'] + df.loc[first_idx, 'Close']
-            ) / 4.0
+            if ha_df is None:
+                ha_df = self._ha_frame(df)
             
-            ha_df.loc[first_idx, 'HA_Open'] = (
-                df.loc[first_idx, 'Open'] + df.loc[first_idx, 'Close']
-            ) / 2.0
+            if state_key is not None:
+                self._last_ha[state_key] = ha_df
+            return ha_df
             
-            ha_df.loc[first_idx, 'HA_High'] = df.loc[first_idx, 'High']
-            ha_df.loc[first_idx, 'HA_Low'] = df.loc[first_idx, 'Low']
+        except Exception as e:
+            self.logger.error(f"Heikin Ashi conversion error: {e}")
+            return None
+
+
+    def _convert_candles_incremental(self, candles, cached):
+        """Candles counterpart of _convert_incremental(); None when a full conversion is needed"""
+        if cached is None or len(cached) < 2:
+            return None
+        
+        # Cached rows from candles.ts[0] through the cached last closed candle (the anchor)
+        start = int(np.searchsorted(cached.ts, candles.ts[0]))
+        kept = len(cached) - 1 - start
+        if kept < 1 or kept > len(candles) or not np.array_equal(cached.ts[start:-1], candles.ts[:kept]):
+            return None
+        
+        first_open = (cached.ha_open[-2] + cached.ha_close[-2]) / 2.0
+        new_columns = heikin_ashi_arrays(
+            candles.open[kept:], candles.high[kept:], candles.low[kept:], candles.close[kept:], first_open
+        )
+        old_columns = (cached.ha_close, cached.ha_open, cached.ha_high, cached.ha_low, cached.ha_hlc3)
+        return HeikinAshiCandles(candles.ts, *(
+            np.concatenate((old[start:-1], new)) for old, new in zip(old_columns, new_columns)
+        ))
+    
+    def convert_candles(self, candles, state_key=None):
+        """
+        Candles -> HeikinAshiCandles without pandas
+        state_key (e.g. (symbol, '1h')) enables incremental updates across calls
+        """
+        if candles is None or len(candles) < 2:
+            return None
+        
+        try:
+            ha = None
+            if state_key is not None:
+                ha = self._convert_candles_incremental(candles, self._last_ha_candles.get(state_key))
             
-            # Calculate subsequent candles
-            for i in range(1, len(df)):
-                curr_idx = ha_df.index[i]
-                prev_idx = ha_df.index[i-1]
-                
-                # HA Close = (O + H + L + C) / 4
-                ha_df.loc[curr_idx, 'HA_Close'] = (
-                    df.loc[curr_idx, 'Open'] + df.loc[curr_idx, 'High'] + 
-                    df.loc[curr_idx, 'Low'] + df.loc[curr_idx, 'Close']
-                ) / 4.0
-                
-                # HA Open = (prev HA Open + prev HA Close) / 2
-                ha_df.loc[curr_idx, 'HA_Open'] = (
-                    ha_df.loc[prev_idx, 'HA_Open'] + ha_df.loc[prev_idx, 'HA_Close']
-                ) / 2.0
-                
-                # HA High = max(H, HA Open, HA Close)
-                ha_df.loc[curr_idx, 'HA_High'] = max(
-                    df.loc[curr_idx, 'High'],
-                    ha_df.loc[curr_idx, 'HA_Open'],
-                    ha_df.loc[curr_idx, 'HA_Close']
-                )
-                
-                # HA Low = min(L, HA Open, HA Close)
-                ha_df.loc[curr_idx, 'HA_Low'] = min(
-                    df.loc[curr_idx, 'Low'],
-                    ha_df.loc[curr_idx, 'HA_Open'],
-                    ha_df.loc[curr_idx, 'HA_Close']
+            if ha is None:
+                ha = HeikinAshiCandles(
+                    candles.ts, *heikin_ashi_arrays(candles.open, candles.high, candles.low, candles.close)
                 )
             
-            return ha_df
+            if state_key is not None:
+                self._last_ha_candles[state_key] = ha
+            return ha
             
         except Exception as e:
             self.logger.error(f"Heikin Ashi conversion error: {e}")
             return None
 
 
+TrendPulseThresholds = namedtuple('TrendPulseThresholds', ['oversold', 'overbought'])
+
+
 class TrendPulseAnalyzer:
     """
     TrendPulse analyzer - exact Pine Script replication
     Your private indicator logic with precise parameter matching
     """
     
+    EXTREME_LEVELS = {'HIGH_RISK': 60, 'STANDARD': 60}  # |wt1|, |wt2| needed for a signal
+    
     def __init__(self):
         # Your exact Pine Script parameters
         self.ch_len = 9      # Channel Length
         self.avg_len = 12    # Average Length
         self.smooth_len = 3  # Smoothing Length
         self.logger = logging.getLogger(__name__)
+        
+        # Warm-start EMA state per (symbol, timeframe), advanced only over closed candles
+        self._ewm_state = {}
+        
+        # Per-thread scratch buffers for the cold-start path (analyze runs in worker threads)
+        self._scratch = threading.local()
+        
+        # Per-tier signal levels, resolved once; unknown tiers use STANDARD
+        self._thresholds = {
+            tier: TrendPulseThresholds(-float(level), float(level))
+            for tier, level in self.EXTREME_LEVELS.items()
+        }
     
-    def ema(self, series, length):
+    def ema(self, values, length):
         """Exponential Moving Average - exact Pine Script calculation"""
-        return series.ewm(span=length, adjust=False).mean()
+        return _ewma_adjust_false(values, 2.0 / (length + 1))
     
-    def sma(self, series, length):
+    def sma(self, values, length):
         """Simple Moving Average"""
-        return series.rolling(window=length).mean()
+        return _sma(values, length)
     
-    def analyze(self, ha_df, tier_type):
+    def _scratch_buffers(self, n, dtype):
+        """Two reusable buffers of length n for the calling thread"""
+        buffers = getattr(self._scratch, 'buffers', None)
+        if buffers is None or buffers.shape[1] < n or buffers.dtype != dtype:
+            buffers = np.empty((2, n), dtype=dtype)
+            self._scratch.buffers = buffers
+        return buffers[0, :n], buffers[1, :n]
+    
+    def _full_compute(self, state_key, index, ha_hlc3):
+        """
+        Cold start: vectorized TrendPulse over the whole frame
+        Returns (wt1, wt2, wt1_prev, wt2_prev) for the last two closed candles
+        """
+        diff, denom = self._scratch_buffers(len(ha_hlc3), ha_hlc3.dtype)
+        
+        # TrendPulse calculation - your exact Pine Script logic
+        esa = self.ema(ha_hlc3, self.ch_len)
+        np.subtract(ha_hlc3, esa, out=diff)
+        dev = self.ema(np.abs(diff, out=denom), self.ch_len)
+        
+        # Avoid division by zero
+        np.copyto(denom, dev)
+        denom[denom == 0] = 0.001
+        np.multiply(denom, 0.015, out=denom)
+        ci = np.divide(diff, denom, out=diff)
+        
+        # Wave Trend calculations
+        wt1 = self.ema(ci, self.avg_len)
+        wt2 = self.sma(wt1, self.smooth_len)
+        
+        # CRITICAL: Only check most recent CLOSED candle
+        if len(wt1) < 3:
+            return None
+        
+        tail = (float(wt1[-2]), float(wt2[-2]), float(wt1[-3]), float(wt2[-3]))
+        if state_key is not None:
+            self._ewm_state[state_key] = {
+                'ts': index[-2],
+                'esa': float(esa[-2]),
+                'dev': float(dev[-2]),
+                'wt1_window': deque(wt1[-1 - self.smooth_len:-1].tolist(), maxlen=self.smooth_len),
+                'tail': tail
+            }
+        return tail
+    
+    def _locate(self, index, ts):
+        """Position of ts in a DatetimeIndex or sorted timestamp array, else None"""
+        if isinstance(index, pd.Index):
+            try:
+                pos = index.get_loc(ts)
+            except KeyError:
+                return None
+            return pos if isinstance(pos, (int, np.integer)) else None
+        try:
+            pos = int(np.searchsorted(index, ts))
+        except TypeError:
+            return None  # State was saved from a DatetimeIndex
+        return pos if pos < len(index) and index[pos] == ts else None
+    
+    def _advance_state(self, state_key, state, index, ha_hlc3):
+        """
+        Warm start: step the saved EMAs forward over candles closed since the last call
+        Returns None when the frame no longer contains the saved candle (cold start needed)
+        """
+        pos = self._locate(index, state['ts'])
+        last_closed = len(index) - 2
+        if pos is None or pos > last_closed:
+            return None
+        if pos == last_closed:
+            return state['tail']
+        
+        alpha_ch = 2.0 / (self.ch_len + 1)
+        alpha_avg = 2.0 / (self.avg_len + 1)
+        esa, dev = state['esa'], state['dev']
+        window = deque(state['wt1_window'], maxlen=self.smooth_len)
+        wt1_current, wt2_current = state['tail'][0], state['tail'][1]
+        
+        for i in range(pos + 1, last_closed + 1):
+            wt1_previous, wt2_previous = wt1_current, wt2_current
+            x = ha_hlc3[i]
+            esa = alpha_ch * x + (1.0 - alpha_ch) * esa
+            dev = alpha_ch * abs(x - esa) + (1.0 - alpha_ch) * dev
+            ci = (x - esa) / (0.015 * (dev if dev != 0 else 0.001))
+            wt1_current = alpha_avg * ci + (1.0 - alpha_avg) * window[-1]
+            window.append(wt1_current)
+            wt2_current = sum(window) / self.smooth_len
+        
+        tail = (float(wt1_current), float(wt2_current), float(wt1_previous), float(wt2_previous))
+        self._ewm_state[state_key] = {
+            'ts': index[last_closed],
+            'esa': float(esa),
+            'dev': float(dev),
+            'wt1_window': window,
+            'tail': tail
+        }
+        return tail
+    
+    def analyze(self, ha_df, tier_type, state_key=None):
         """
         Analyze Heikin Ashi data with exact Pine Script logic
         Only checks most recent CLOSED candle - no historical loops
+        state_key (e.g. (symbol, '1h')) enables warm-started EMAs across calls
         """
         if ha_df is None or len(ha_df) < self.ch_len + self.avg_len + 5:
             return {
@@ -118,24 +546,66 @@ class TrendPulseAnalyzer:
                 'strength': 0
             }
         
+        # Use HLC3 from Heikin Ashi candles (your exact calculation)
+        if 'HA_HLC3' in ha_df:
+            ha_hlc3 = ha_df['HA_HLC3'].to_numpy(dtype=INDICATOR_DTYPE)
+        else:
+            ha_hlc3 = ((ha_df['HA_High'] + ha_df['HA_Low'] + ha_df['HA_Close']) / 3.0).to_numpy(dtype=INDICATOR_DTYPE)
+        
+        return self.analyze_hlc3(ha_hlc3, tier_type, ha_df.index, state_key)
+    
+    def analyze_candles(self, ha, tier_type, state_key=None):
+        """analyze() for HeikinAshiCandles from HeikinAshiConverter.convert_candles()"""
+        if ha is None:
+            return self.analyze_hlc3(np.empty(0, dtype=INDICATOR_DTYPE), tier_type)
+        return self.analyze_hlc3(ha.ha_hlc3, tier_type, ha.ts, state_key)
+    
+    def from_ohlcv_ndarray(self, ohlcv, tier_type, state_key=None):
+        """
+        Analyze raw ccxt-shaped OHLCV rows (timestamp_ms, O, H, L, C, V) without pandas
+        Heikin Ashi conversion happens on the arrays; returns the same dict as analyze()
+        """
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        if ohlcv.ndim != 2 or len(ohlcv) < self.ch_len + self.avg_len + 5:
+            return {
+                'has_signal': False,
+                'signal_type': 'none',
+                'wt1': 0,
+                'wt2': 0,
+                'strength': 0
+            }
+        
+        o, h, l, c = ohlcv[:, 1:5].astype(INDICATOR_DTYPE).T
+        ha_hlc3 = heikin_ashi_arrays(o, h, l, c)[4]
+        return self.analyze_hlc3(ha_hlc3, tier_type, ohlcv[:, 0].astype(np.int64), state_key)
+    
+    def analyze_hlc3(self, ha_hlc3, tier_type, timestamps=None, state_key=None):
+        """
+        Array entry point behind analyze(): HA HLC3 values plus their candle timestamps
+        Warm-start state needs timestamps (DatetimeIndex or sorted int64 ms array)
+        """
+        if len(ha_hlc3) < self.ch_len + self.avg_len + 5:
+            return {
+                'has_signal': False,
+                'signal_type': 'none',
+                'wt1': 0,
+                'wt2': 0,
+                'strength': 0
+            }
+        if timestamps is None:
+            state_key = None
+        
         try:
-            # Use HLC3 from Heikin Ashi candles (your exact calculation)
-            ha_hlc3 = (ha_df['HA_High'] + ha_df['HA_Low'] + ha_df['HA_Close']) / 3.0
-            
-            # TrendPulse calculation - your exact Pine Script logic
-            esa = self.ema(ha_hlc3, self.ch_len)
-            dev = self.ema(abs(ha_hlc3 - esa), self.ch_len)
-            
-            # Avoid division by zero
-            dev_safe = dev.replace(0, 0.001)
-            ci = (ha_hlc3 - esa) / (0.015 * dev_safe)
-            
-            # Wave Trend calculations
-            wt1 = self.ema(ci, self.avg_len)
-            wt2 = self.sma(wt1, self.smooth_len)
+            state = self._ewm_state.get(state_key) if state_key is not None else None
             
-            # CRITICAL: Only check most recent CLOSED candle
-            if len(wt1) < 3:
+            if state and timestamps[-2] == state['ts']:
+                # Early exit: no candle closed since the saved state, closed-candle values are unchanged
+                tail = state['tail']
+            else:
+                tail = self._advance_state(state_key, state, timestamps, ha_hlc3) if state else None
+                if tail is None:
+                    tail = self._full_compute(state_key, timestamps, ha_hlc3)
+            if tail is None:
                 return {
                     'has_signal': False,
                     'signal_type': 'none',
@@ -145,21 +615,12 @@ class TrendPulseAnalyzer:
                 }
             
             # Current values from closed candle (not in-progress candle)
-            wt1_current = float(wt1.iloc[-2])   # Most recent closed
-            wt2_current = float(wt2.iloc[-2])
-            wt1_previous = float(wt1.iloc[-3])  # Previous closed
-            wt2_previous = float(wt2.iloc[-3])
+            wt1_current, wt2_current, wt1_previous, wt2_previous = tail
             
-            # In TrendPulseAnalyzer.analyze() for HIGH_RISK
-            if tier_type == "HIGH_RISK":
-                # FIXED: Use your exact HIGH_RISK thresholds
-                oversold   = (wt1_current <= -60) and (wt2_current <= -60)
-                overbought = (wt1_current >= 60)  and (wt2_current >= 60)
-            else:
-                # STANDARD (no change)
-                oversold   = (wt1_current <= -60) and (wt2_current <= -60)
-                overbought = (wt1_current >= 60)  and (wt2_current >= 60)
-
+            # Tier thresholds (HIGH_RISK and STANDARD are both +/-60 today)
+            th = self._thresholds.get(tier_type) or self._thresholds['STANDARD']
+            oversold   = (wt1_current <= th.oversold) and (wt2_current <= th.oversold)
+            overbought = (wt1_current >= th.overbought) and (wt2_current >= th.overbought)
             
             # Cross detection (your exact logic)
             bullish_cross = (wt1_previous <= wt2_previous) and (wt1_current > wt2_current)
@@ -196,6 +657,40 @@ class TrendPulseAnalyzer:
             }
 
 
+    def analyze_batch(self, ha_hlc3_2d, tier_types):
+        """
+        Vectorized analyze() over many coins
+        ha_hlc3_2d: (n_coins, n_bars) HA HLC3, rows aligned on the same candles (NaN-pad the front)
+        tier_types: per-row tier names; returns a dict of per-coin arrays
+        """
+        hlc3 = np.ascontiguousarray(ha_hlc3_2d, dtype=INDICATOR_DTYPE)
+        wt1_curr, wt2_curr, wt1_prev, wt2_prev = _wave_trend_batch(
+            hlc3, self.ch_len, self.avg_len, self.smooth_len
+        )
+        
+        standard = self._thresholds['STANDARD']
+        levels = np.array([self._thresholds.get(tier, standard).overbought for tier in tier_types], dtype=np.float64)
+        oversold = (wt1_curr <= -levels) & (wt2_curr <= -levels)
+        overbought = (wt1_curr >= levels) & (wt2_curr >= levels)
+        
+        bullish_cross = (wt1_prev <= wt2_prev) & (wt1_curr > wt2_curr)
+        bearish_cross = (wt1_prev >= wt2_prev) & (wt1_curr < wt2_curr)
+        
+        buy = bullish_cross & oversold
+        sell = bearish_cross & overbought & ~buy
+        
+        return {
+            'has_signal': buy | sell,
+            'signal_type': np.where(buy, 'BUY', np.where(sell, 'SELL', 'none')),
+            'wt1': wt1_curr,
+            'wt2': wt2_curr,
+            'wt1_prev': wt1_prev,
+            'wt2_prev': wt2_prev,
+            'strength': np.abs(wt1_curr) + np.abs(wt2_curr),
+            'cross_type': np.where(bullish_cross, 'bullish', np.where(bearish_cross, 'bearish', 'none'))
+        }
+
+
 class StochRSICalculator:
     """
     Stochastic RSI calculator for 2H confirmation
@@ -208,59 +703,65 @@ class StochRSICalculator:
         self.k_smooth = k_smooth
         self.d_smooth = d_smooth
         self.logger = logging.getLogger(__name__)
+        
+        # (symbol, timeframe) -> (closed candle timestamp, result); K/D at the closed candle
+        # never depend on the in-progress one, so an unchanged closed candle reuses the result
+        self._last_result = {}
     
     def calculate_rsi(self, close_prices):
         """Calculate RSI using standard formula"""
-        delta = close_prices.diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(window=self.rsi_period).mean()
-        avg_loss = loss.rolling(window=self.rsi_period).mean()
-        
-        # Avoid division by zero
-        rs = avg_gain / avg_loss.replace(0, 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
+        rsi = _rsi_sma(close_prices.to_numpy(dtype=INDICATOR_DTYPE), self.rsi_period)
+        return pd.Series(rsi, index=close_prices.index)
     
-    def calculate(self, df):
+    def calculate(self, df, state_key=None):
         """
         Calculate Stochastic RSI for 2H confirmation
         Returns current K and D values for signal confirmation
+        state_key (e.g. (symbol, '2h')) reuses the last result while the closed candle is unchanged
         """
-        if df is None or len(df) < self.rsi_period + self.stoch_period + self.k_smooth + self.d_smooth + 10:
+        if df is None:
+            return None
+        return self._calculate_memoized(df['Close'].to_numpy(dtype=INDICATOR_DTYPE), df.index, state_key)
+    
+    def calculate_candles(self, candles, state_key=None):
+        """calculate() for Candles; memoized on the closed candle like calculate()"""
+        if candles is None:
+            return None
+        return self._calculate_memoized(candles.close, candles.ts, state_key)
+    
+    def _calculate_memoized(self, close_prices, timestamps, state_key):
+        """calculate_from_close(), reusing the last result while the closed candle is unchanged"""
+        if state_key is None or len(timestamps) < 2:
+            return self.calculate_from_close(close_prices)
+        
+        closed_ts = timestamps[-2]
+        cached = self._last_result.get(state_key)
+        if cached is not None and cached[0] == closed_ts:
+            # Fresh copy: the K/D values are reused, calculation_timestamp is restamped for this call
+            return {**cached[1], 'calculation_timestamp': datetime.utcnow()}
+        
+        result = self.calculate_from_close(close_prices)
+        if result is not None:
+            self._last_result[state_key] = (closed_ts, result)
+        return result
+    
+    def calculate_from_close(self, close_prices):
+        """Array entry point behind calculate(): 2H close prices as a NumPy array"""
+        if len(close_prices) < self.rsi_period + self.stoch_period + self.k_smooth + self.d_smooth + 10:
             return None
         
         try:
-            # Calculate RSI first
-            close_prices = df['Close']
-            rsi = self.calculate_rsi(close_prices)
-            
-            # Calculate Stochastic of RSI
-            rsi_min = rsi.rolling(window=self.stoch_period).min()
-            rsi_max = rsi.rolling(window=self.stoch_period).max()
-            
-            # Avoid division by zero
-            rsi_range = rsi_max - rsi_min
-            rsi_range = rsi_range.replace(0, 1e-10)
-            
-            stoch_rsi = ((rsi - rsi_min) / rsi_range) * 100
-            
-            # Smooth with moving averages
-            stoch_rsi_k = stoch_rsi.rolling(window=self.k_smooth).mean()
-            stoch_rsi_d = stoch_rsi_k.rolling(window=self.d_smooth).mean()
+            close_prices = np.ascontiguousarray(close_prices, dtype=INDICATOR_DTYPE)
+            k_tail, d_tail = _stochrsi(close_prices, self.rsi_period, self.stoch_period, self.k_smooth, self.d_smooth)
             
             # Get current values from most recent CLOSED candle
-            if len(stoch_rsi_k) < 2 or len(stoch_rsi_d) < 2:
+            if len(k_tail) < 2 or len(d_tail) < 2:
                 return None
             
-            current_k = float(stoch_rsi_k.iloc[-2])  # Closed candle
-            current_d = float(stoch_rsi_d.iloc[-2])  # Closed candle
+            current_k = float(k_tail[0])  # Closed candle
+            current_d = float(d_tail[0])  # Closed candle
             
             return {
-                'stoch_rsi_k': stoch_rsi_k,
-                'stoch_rsi_d': stoch_rsi_d,
                 'current_k': current_k,
                 'current_d': current_d,
                 'calculation_timestamp': datetime.utcnow()
@@ -269,3 +770,32 @@ class StochRSICalculator:
         except Exception as e:
             self.logger.error(f"StochRSI calculation error: {e}")
             return None
+
+
+SIGNAL_CODES = {'BUY': 1, 'SELL': -1}  # int8 codes for vectorized confirmation
+
+
+def stochrsi_confirmations(signal_codes, k, d, oversold=20, overbought=80):
+    """
+    2H StochRSI confirmation for many TrendPulse signals in one NumPy pass
+    BUY (1) needs K and D oversold, SELL (-1) needs both overbought; returns a bool array
+    """
+    signal_codes = np.asarray(signal_codes)
+    k = np.asarray(k)
+    d = np.asarray(d)
+    return (
+        ((signal_codes == 1) & (k < oversold) & (d < oversold)) |
+        ((signal_codes == -1) & (k > overbought) & (d > overbought))
+    )
+
+
+def _warm_up_kernels():
+    """Compile (or load from the on-disk cache) the per-coin kernels at import, not on the first cycle"""
+    x = np.linspace(1.0, 2.0, 64, dtype=INDICATOR_DTYPE)
+    heikin_ashi_arrays(x, x, x, x)
+    _ewma_adjust_false(x, 0.1)
+    _sma(x, 4)
+    _stochrsi(x, 14, 14, 3, 3)
+
+
+_warm_up_kernels()
@@ -4,68 +4,145 @@ Handles coin discovery, filtering, and multi-timeframe data collection
 Optimized for API limits with smart caching
 """
 
-import requests
+import asyncio
+import aiohttp
 import pandas as pd
+import numpy as np
 import ccxt
-import json
+import ccxt.async_support as ccxt_async
+import orjson
+import pickle
 import time
 import os
-from datetime import datetime, timedelta
+import atexit
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import logging
 
+from utils import INDICATOR_DTYPE, get_env
+from analyzers import Candles
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter shared by concurrent API calls
+    Blocks until a call fits within max_calls per period seconds
+    """
+    
+    def __init__(self, max_calls, period):
+        self.max_calls = max_calls
+        self.period = period
+        self._call_times = deque()
+        self._lock = threading.Lock()
+    
+    def _reserve(self):
+        """Record a call if a slot is free; otherwise return seconds until one frees up"""
+        with self._lock:
+            now = time.monotonic()
+            while self._call_times and now - self._call_times[0] >= self.period:
+                self._call_times.popleft()
+            if len(self._call_times) < self.max_calls:
+                self._call_times.append(now)
+                return 0
+            return self.period - (now - self._call_times[0])
+    
+    def acquire(self):
+        """Wait for a free slot and record the call"""
+        while (wait := self._reserve()) > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Coroutine version of acquire() for event-loop callers"""
+        while (wait := self._reserve()) > 0:
+            await asyncio.sleep(wait)
+
+
 class CoinGeckoManager:
     """
     CoinGecko API manager with optimized caching and pagination
     Stays within free tier limits while providing comprehensive coverage
     """
     
-    def __init__(self, cache_dir):
+    PAGES = 5             # 5 x 250 = ~1250 coins
+    RATE_LIMIT_CALLS = 30  # Free tier: ~30 requests per minute
+    MAX_RETRIES = 3       # Retries per page on 429/5xx, with exponential backoff
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    CACHE_TTL = 1800      # Seconds before cached coins are refetched
+    
+    def __init__(self, cache_dir, cache_ttl=None):
         self.cache_dir = Path(cache_dir)
-        self.cache_file = self.cache_dir / "coingecko_cache.json"
+        self.cache_ttl = self.CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_file = self.cache_dir / "coingecko_cache.pkl"
+        self.legacy_cache_file = self.cache_dir / "coingecko_cache.json"
         self.api_calls_used = 0
+        self.rate_limiter = RateLimiter(self.RATE_LIMIT_CALLS, 60)
         self.logger = logging.getLogger(__name__)
+        self._mem_cache = None  # (coins, ts) from the last cache read/write in this process
+        self._tiers = None      # (ts, categorized) so cached cycles skip re-splitting the tiers
     
     def load_cache(self):
-        """Load cached coin data with timestamp validation"""
-        if self.cache_file.exists():
-            try:
-                cache_data = json.loads(self.cache_file.read_text())
-                coins = cache_data.get('coins', [])
-                timestamp = datetime.fromisoformat(cache_data.get('timestamp', '2000-01-01'))
-                return coins, timestamp
-            except Exception as e:
-                self.logger.error(f"Cache loading error: {e}")
-                return [], datetime.min
-        return [], datetime.min
+        """Load cached coin data and its UNIX write time (memoized in-process)"""
+        if self._mem_cache is not None:
+            return self._mem_cache
+        try:
+            if self.cache_file.exists():
+                cache_data = pickle.loads(self.cache_file.read_bytes())
+            elif self.legacy_cache_file.exists():
+                # Migrate the old JSON cache; the next save writes the pickle
+                cache_data = orjson.loads(self.legacy_cache_file.read_bytes())
+            else:
+                return [], 0
+            self._mem_cache = (cache_data.get('coins', []), cache_data.get('ts', 0))
+            return self._mem_cache
+        except Exception as e:
+            self.logger.error(f"Cache loading error: {e}")
+            return [], 0
     
     def save_cache(self, coins):
         """Save coins to cache with timestamp"""
         cache_data = {
             'coins': coins,
-            'timestamp': datetime.utcnow().isoformat(),
+            'ts': int(time.time()),
             'total_coins': len(coins),
-            'cache_version': '3.0'
+            'cache_version': '3.1'
         }
         try:
-            self.cache_file.write_text(json.dumps(cache_data, indent=2))
+            self.cache_file.write_bytes(pickle.dumps(cache_data, protocol=pickle.HIGHEST_PROTOCOL))
+            if self.legacy_cache_file.exists():
+                self.legacy_cache_file.unlink()
         except Exception as e:
             self.logger.error(f"Cache saving error: {e}")
+        self._mem_cache = (coins, cache_data['ts'])
     
     def get_dual_tier_coins(self):
-        """Fetch coins with pagination and dual-tier filtering"""
-        cached_coins, cache_time = self.load_cache()
-        now = datetime.utcnow()
+        """
+        Fetch coins with pagination and dual-tier filtering
+        Runs on a throwaway event loop; callers with their own loop await get_dual_tier_coins_async()
+        """
+        return asyncio.run(self.get_dual_tier_coins_async())
+    
+    def cache_expires_within(self, seconds):
+        """True if the cached coins will be due for a refresh within the given number of seconds"""
+        _, cache_ts = self.load_cache()
+        return time.time() - cache_ts + seconds >= self.cache_ttl
+    
+    async def get_dual_tier_coins_async(self, force=False):
+        """
+        Coroutine behind get_dual_tier_coins(): pages are fetched concurrently with aiohttp
+        force=True refetches even if the cache is still fresh (early background refresh)
+        """
+        cached_coins, cache_ts = self.load_cache()
         
-        # Use cache if less than 30 minutes old
-        cache_age_minutes = (now - cache_time).total_seconds() / 60
-        if cache_age_minutes < 30:
-            self.logger.info(f"Using cached CoinGecko data (age: {cache_age_minutes:.1f} min)")
-            return self.categorize_coins(cached_coins), 0
+        # Serve from the in-process cache until it is cache_ttl old
+        cache_age = time.time() - cache_ts
+        if cache_age < self.cache_ttl and not force:
+            self.logger.info(f"Using cached CoinGecko data (age: {cache_age / 60:.1f} min)")
+            return self.cached_tiers(cached_coins, cache_ts), 0
         
         # Fetch fresh data
         self.logger.info("Fetching fresh CoinGecko data with pagination...")
-        api_key = os.environ.get('COINGECKO_API_KEY', '')
+        api_key = get_env('COINGECKO_API_KEY', '')
         url = "https://api.coingecko.com/api/v3/coins/markets"
         headers = {'x-cg-demo-api-key': api_key} if api_key else {}
         
@@ -73,28 +150,21 @@ class CoinGeckoManager:
         api_calls = 0
         
         try:
-            # Fetch 5 pages to get ~1250 coins
-            for page in range(1, 6):
-                params = {
-                    'vs_currency': 'usd',
-                    'order': 'market_cap_desc',
-                    'per_page': 250,
-                    'page': page,
-                    'sparkline': 'false'
-                }
-                
-                self.logger.info(f"Fetching CoinGecko page {page}...")
-                response = requests.get(url, params=params, headers=headers, timeout=30)
-                response.raise_for_status()
-                
-                data = response.json()
-                api_calls += 1
-                
+            # Fetch all pages concurrently; the shared rate limiter keeps us under the free tier
+            connector = aiohttp.TCPConnector(limit=self.PAGES)
+            timeout = aiohttp.ClientTimeout(total=30)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+                results = await asyncio.gather(*(
+                    self.fetch_markets_page(session, url, page) for page in range(1, self.PAGES + 1)
+                ))
+            pages = dict(zip(range(1, self.PAGES + 1), results))
+            api_calls = len(pages)
+            
+            # Merge in page order, stopping at the first empty page
+            for page, data in sorted(pages.items()):
                 if not data:
                     break
-                
                 all_coins.extend(data)
-                time.sleep(0.2)  # Rate limiting
             
             self.logger.info(f"Fetched {len(all_coins)} total coins from {api_calls} API calls")
             
@@ -105,7 +175,7 @@ class CoinGeckoManager:
             self.save_cache(filtered_coins)
             self.api_calls_used += api_calls
             
-            categorized = self.categorize_coins(filtered_coins)
+            categorized = self.cached_tiers(*self._mem_cache)
             self.logger.info(f"HIGH RISK: {len(categorized['high_risk'])}, STANDARD: {len(categorized['standard'])}")
             
             return categorized, api_calls
@@ -113,17 +183,39 @@ class CoinGeckoManager:
         except Exception as e:
             self.logger.error(f"CoinGecko API error: {e}")
             # Fallback to cached data
-            return self.categorize_coins(cached_coins), 0
+            return self.cached_tiers(cached_coins, cache_ts), 0
+    
+    async def fetch_markets_page(self, session, url, page):
+        """Fetch one page of /coins/markets, waiting on the rate limiter before each attempt"""
+        params = {
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'per_page': 250,
+            'page': page,
+            'sparkline': 'false'
+        }
+        
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self.rate_limiter.acquire_async()
+            self.logger.info(f"Fetching CoinGecko page {page}...")
+            async with session.get(url, params=params) as response:
+                if response.status in self.RETRY_STATUSES and attempt < self.MAX_RETRIES:
+                    await asyncio.sleep(0.3 * (2 ** attempt))
+                    continue
+                response.raise_for_status()
+                return orjson.loads(await response.read())
     
     def filter_coins(self, raw_coins):
         """Apply market cap and volume filtering"""
-        filtered = []
         stablecoins = {'USDT', 'USDC', 'DAI', 'BUSD', 'USDE', 'FDUSD', 'TUSD'}
+        kept = []
+        append = kept.append
         
         for coin in raw_coins:
-            market_cap = coin.get('market_cap', 0) or 0
-            volume_24h = coin.get('total_volume', 0) or 0
-            current_price = coin.get('current_price', 0) or 0
+            get = coin.get
+            market_cap = get('market_cap', 0) or 0
+            volume_24h = get('total_volume', 0) or 0
+            current_price = get('current_price', 0) or 0
             
             # Skip coins with missing critical data
             if market_cap <= 0 or volume_24h <= 0 or current_price <= 0:
@@ -141,19 +233,28 @@ class CoinGeckoManager:
                 volume_24h >= 30_000_000
             )
             
+            if not (high_risk_qualified or standard_qualified):
+                continue
+            
             # Include if qualified and not a stablecoin
-            if ((high_risk_qualified or standard_qualified) and 
-                coin['symbol'].upper() not in stablecoins):
-                
-                filtered.append({
-                    'id': coin['id'],
-                    'symbol': coin['symbol'].upper(),
-                    'name': coin['name'],
-                    'market_cap': market_cap,
-                    'total_volume': volume_24h,
-                    'current_price': current_price,
-                    'price_change_24h': coin.get('price_change_percentage_24h', 0)
-                })
+            symbol = coin['symbol'].upper()
+            if symbol not in stablecoins:
+                append((coin['id'], symbol, coin['name'], market_cap, volume_24h, current_price,
+                        get('price_change_percentage_24h', 0)))
+        
+        # Build output dicts only for the coins that survived filtering
+        filtered = [
+            {
+                'id': coin_id,
+                'symbol': symbol,
+                'name': name,
+                'market_cap': market_cap,
+                'total_volume': volume_24h,
+                'current_price': current_price,
+                'price_change_24h': price_change_24h
+            }
+            for coin_id, symbol, name, market_cap, volume_24h, current_price, price_change_24h in kept
+        ]
         
         return filtered
     
@@ -167,10 +268,15 @@ class CoinGeckoManager:
             'standard': standard
         }
     
+    def cached_tiers(self, coins, ts):
+        """categorize_coins() memoized on the cache write time"""
+        if self._tiers is None or self._tiers[0] != ts:
+            self._tiers = (ts, self.categorize_coins(coins))
+        return self._tiers[1]
+    
     def get_cached_coins(self):
         """Get coins from cache only (for 5-minute cycles)"""
-        cached_coins, _ = self.load_cache()
-        return self.categorize_coins(cached_coins), 0
+        return self.cached_tiers(*self.load_cache()), 0
 
 
 class MultiExchangeManager:
@@ -179,11 +285,30 @@ class MultiExchangeManager:
     Prioritizes BingX but falls back to other exchanges for better coverage
     """
     
-    def __init__(self):
+    SYMBOL_CACHE_TTL = 7 * 24 * 3600  # Seconds before persisted symbol resolutions are refreshed
+    EXCHANGE_PRIORITY = ['bingx', 'binance', 'okx', 'bybit']
+    
+    def __init__(self, cache_dir=None):
         self.exchanges = {}
         self.symbol_cache = {}
         self.logger = logging.getLogger(__name__)
+        
+        # (exchange_name, base_symbol) -> resolved market symbol or None
+        self._symbol_resolution_cache = {}
+        # base_symbol -> (exchange_name, market symbol) chosen by EXCHANGE_PRIORITY, or None
+        self._coin_resolution = {}
+        self._markets_by_base = {}
+        self._exchange_configs = {}  # name -> ccxt config, reused for the async twins
+        self._async_exchanges = {}
+        self._symbol_cache_dirty = False
+        self._symbol_cache_ts = None  # Creation time of the persisted resolutions (TTL anchor)
+        self.symbol_cache_file = Path(cache_dir) / "symbol_resolution_cache.json" if cache_dir else None
+        
         self.initialize_exchanges()
+        self.load_symbol_cache()
+        self.invalidate_stale_resolutions()
+        if self.symbol_cache_file:
+            atexit.register(self.save_symbol_cache)
     
     def initialize_exchanges(self):
         """Initialize all exchanges with error handling"""
@@ -191,8 +316,8 @@ class MultiExchangeManager:
             'bingx': {
                 'class': ccxt.bingx,
                 'config': {
-                    'apiKey': os.environ.get('BINGX_API_KEY', ''),
-                    'secret': os.environ.get('BINGX_SECRET_KEY', ''),
+                    'apiKey': get_env('BINGX_API_KEY', ''),
+                    'secret': get_env('BINGX_SECRET_KEY', ''),
                     'enableRateLimit': True,
                     'timeout': 30000,
                 }
@@ -225,15 +350,111 @@ class MultiExchangeManager:
                 exchange = config['class'](config['config'])
                 exchange.load_markets()
                 self.exchanges[name] = exchange
+                self._exchange_configs[name] = config['config']
+                self._markets_by_base[name] = self.index_markets_by_base(exchange.markets)
                 self.logger.info(f"✅ {name.upper()} exchange initialized")
             except Exception as e:
                 self.logger.warning(f"⚠️ Failed to initialize {name}: {str(e)[:50]}")
     
+    def index_markets_by_base(self, markets):
+        """Group market symbols by base so a coin's candidates are a single dict access"""
+        markets_by_base = defaultdict(list)
+        for market_symbol in markets:
+            markets_by_base[market_symbol.split('/')[0]].append(market_symbol)
+        return markets_by_base
+    
+    def load_symbol_cache(self):
+        """Load persisted symbol resolutions if younger than SYMBOL_CACHE_TTL"""
+        if not self.symbol_cache_file or not self.symbol_cache_file.exists():
+            return
+        try:
+            cache_data = orjson.loads(self.symbol_cache_file.read_bytes())
+            if time.time() - cache_data.get('ts', 0) < self.SYMBOL_CACHE_TTL:
+                for exchange_name, base_symbol, resolved in cache_data.get('entries', []):
+                    self._symbol_resolution_cache[(exchange_name, base_symbol)] = resolved
+                for base_symbol, resolved in cache_data.get('coins', {}).items():
+                    self._coin_resolution[base_symbol] = tuple(resolved) if resolved else None
+                self._symbol_cache_ts = cache_data['ts']
+                self.logger.info(f"Loaded {len(self._symbol_resolution_cache)} cached symbol resolutions")
+        except Exception as e:
+            self.logger.error(f"Symbol cache loading error: {e}")
+    
+    def _is_live_market(self, exchange_name, market_symbol):
+        """True if the freshly loaded markets still list market_symbol as active"""
+        exchange = self.exchanges.get(exchange_name)
+        if not exchange or market_symbol not in exchange.markets:
+            return False
+        return bool(exchange.markets[market_symbol].get('active', True))
+    
+    def invalidate_stale_resolutions(self):
+        """
+        Drop persisted resolutions contradicted by the markets loaded this run:
+        markets gone or inactive, exchanges not available, or 'not listed' bases that now are
+        """
+        stale = []
+        for (exchange_name, base_symbol), resolved in self._symbol_resolution_cache.items():
+            if exchange_name not in self.exchanges:
+                continue  # Never consulted while the exchange is down
+            if resolved is None:
+                if base_symbol in self._markets_by_base[exchange_name]:
+                    stale.append((exchange_name, base_symbol))
+            elif not self._is_live_market(exchange_name, resolved):
+                stale.append((exchange_name, base_symbol))
+        for cache_key in stale:
+            del self._symbol_resolution_cache[cache_key]
+        
+        stale_coins = []
+        for base_symbol, resolved in self._coin_resolution.items():
+            if resolved is None:
+                if any(base_symbol in markets for markets in self._markets_by_base.values()):
+                    stale_coins.append(base_symbol)
+            elif not self._is_live_market(*resolved):
+                stale_coins.append(base_symbol)
+        for base_symbol in stale_coins:
+            del self._coin_resolution[base_symbol]
+        
+        if stale or stale_coins:
+            self._symbol_cache_dirty = True
+            self.logger.info(f"Invalidated {len(stale) + len(stale_coins)} stale symbol resolutions")
+    
+    def save_symbol_cache(self):
+        """Persist symbol resolutions if any were added this run"""
+        if not self.symbol_cache_file or not self._symbol_cache_dirty:
+            return
+        cache_data = {
+            'ts': self._symbol_cache_ts or int(time.time()),
+            'entries': [[exchange_name, base_symbol, resolved]
+                        for (exchange_name, base_symbol), resolved in self._symbol_resolution_cache.items()],
+            'coins': {base_symbol: list(resolved) if resolved else None
+                      for base_symbol, resolved in self._coin_resolution.items()}
+        }
+        try:
+            self.symbol_cache_file.write_bytes(orjson.dumps(cache_data))
+            self._symbol_cache_ts = cache_data['ts']
+            self._symbol_cache_dirty = False
+        except Exception as e:
+            self.logger.error(f"Symbol cache saving error: {e}")
+    
     def find_symbol_on_exchange(self, exchange_name, base_symbol):
-        """Find working symbol format on specific exchange"""
+        """Find working symbol format on specific exchange (memoized per exchange/base)"""
         if exchange_name not in self.exchanges:
             return None
         
+        cache_key = (exchange_name, base_symbol)
+        if cache_key in self._symbol_resolution_cache:
+            return self._symbol_resolution_cache[cache_key]
+        
+        resolved = self.resolve_symbol(exchange_name, base_symbol)
+        self._symbol_resolution_cache[cache_key] = resolved
+        self._symbol_cache_dirty = True
+        return resolved
+    
+    def resolve_symbol(self, exchange_name, base_symbol):
+        """Pick the first active market among the preferred quote/contract variations"""
+        candidates = self._markets_by_base[exchange_name].get(base_symbol)
+        if not candidates:
+            return None
+        
         exchange = self.exchanges[exchange_name]
         symbol_variations = [
             f"{base_symbol}/USDT",
@@ -249,18 +470,33 @@ class MultiExchangeManager:
             ])
         
         for symbol_format in symbol_variations:
-            try:
-                if symbol_format in exchange.markets:
-                    market = exchange.markets[symbol_format]
-                    if market.get('active', True):
-                        return symbol_format
-            except:
-                continue
+            if symbol_format in candidates and exchange.markets[symbol_format].get('active', True):
+                return symbol_format
         
         return None
     
-    def fetch_ohlcv_with_retry(self, exchange_name, symbol, timeframe, limit):
-        """Fetch OHLCV data with retry mechanism"""
+    def get_chart_exchange_map(self, symbols):
+        """
+        Map each symbol to the highest-priority TradingView exchange listing its USDT pair
+        Uses already-loaded markets, so no network calls are made
+        """
+        chart_priority = [('BYBIT', 'bybit'), ('BINANCE', 'binance'), ('OKX', 'okx')]
+        exchange_map = {}
+        
+        for symbol in symbols:
+            for tv_exchange, exchange_name in chart_priority:
+                exchange = self.exchanges.get(exchange_name)
+                if exchange and f"{symbol}/USDT" in exchange.markets:
+                    exchange_map[symbol] = tv_exchange
+                    break
+        
+        return exchange_map
+    
+    def fetch_ohlcv_array(self, exchange_name, symbol, timeframe, limit):
+        """
+        Fetch OHLCV rows as a float64 (n, 6) array [timestamp_ms, O, H, L, C, V] with retries
+        Rows with missing/non-finite values are dropped; None if fewer than 30 remain
+        """
         if exchange_name not in self.exchanges:
             return None
         
@@ -272,18 +508,12 @@ class MultiExchangeManager:
                 ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
                 
                 if ohlcv and len(ohlcv) >= 30:
-                    df = pd.DataFrame(ohlcv, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-                    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                    df.set_index('timestamp', inplace=True)
+                    # Single typed allocation; drop rows with missing/non-finite values
+                    arr = np.asarray(ohlcv, dtype=np.float64)
+                    arr = arr[np.isfinite(arr).all(axis=1)]
                     
-                    # Convert to numeric
-                    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                    
-                    df = df.dropna()
-                    
-                    if len(df) >= 30:
-                        return df
+                    if len(arr) >= 30:
+                        return arr
                 
                 return None
                 
@@ -295,32 +525,197 @@ class MultiExchangeManager:
         
         return None
     
-    def get_multi_timeframe_data(self, symbol, timeframes):
+    def get_async_exchange(self, exchange_name):
+        """ccxt.async_support twin of an initialized exchange, sharing its already-loaded markets"""
+        exchange = self._async_exchanges.get(exchange_name)
+        if exchange is None and exchange_name in self.exchanges:
+            sync_exchange = self.exchanges[exchange_name]
+            exchange = getattr(ccxt_async, exchange_name)(self._exchange_configs[exchange_name])
+            exchange.set_markets(sync_exchange.markets, sync_exchange.currencies)
+            self._async_exchanges[exchange_name] = exchange
+        return exchange
+    
+    async def fetch_ohlcv_array_async(self, exchange_name, symbol, timeframe, limit):
+        """Coroutine version of fetch_ohlcv_array() on the async exchange twin"""
+        exchange = self.get_async_exchange(exchange_name)
+        if exchange is None:
+            return None
+        
+        max_retries = 3
+        
+        for attempt in range(max_retries):
+            try:
+                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                
+                if ohlcv and len(ohlcv) >= 30:
+                    arr = np.asarray(ohlcv, dtype=np.float64)
+                    arr = arr[np.isfinite(arr).all(axis=1)]
+                    
+                    if len(arr) >= 30:
+                        return arr
+                
+                return None
+                
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(0.5 * (attempt + 1))
+                    continue
+                return None
+        
+        return None
+    
+    def ohlcv_to_frame(self, arr):
+        """OHLCV DataFrame (timestamp index) from a fetch_ohlcv_array() result"""
+        if arr is None:
+            return None
+        
+        # Timestamps stay exact int64 ms; prices/volume use the indicator precision
+        index = pd.to_datetime(arr[:, 0].astype('int64'), unit='ms')
+        index.name = 'timestamp'
+        values = arr[:, 1:].astype(INDICATOR_DTYPE)
+        return pd.DataFrame({
+            'Open': values[:, 0],
+            'High': values[:, 1],
+            'Low': values[:, 2],
+            'Close': values[:, 3],
+            'Volume': values[:, 4]
+        }, index=index)
+    
+    def ohlcv_to_candles(self, arr):
+        """Candles (structure of arrays) from a fetch_ohlcv_array() result"""
+        if arr is None:
+            return None
+        return Candles.from_ohlcv(arr)
+    
+    def fetch_ohlcv_with_retry(self, exchange_name, symbol, timeframe, limit):
+        """Fetch OHLCV data with retry mechanism (DataFrame wrapper over fetch_ohlcv_array)"""
+        return self.ohlcv_to_frame(self.fetch_ohlcv_array(exchange_name, symbol, timeframe, limit))
+    
+    def resolve_coin(self, symbol):
+        """(exchange_name, market symbol) for a coin by exchange priority, memoized and persisted"""
+        resolved = self._coin_resolution.get(symbol)
+        if resolved and resolved[0] in self.exchanges:
+            return resolved
+        if symbol in self._coin_resolution and resolved is None:
+            return None
+        
+        resolved = None
+        for exchange_name in self.EXCHANGE_PRIORITY:
+            symbol_format = self.find_symbol_on_exchange(exchange_name, symbol)
+            if symbol_format:
+                resolved = (exchange_name, symbol_format)
+                break
+        
+        self._coin_resolution[symbol] = resolved
+        self._symbol_cache_dirty = True
+        return resolved
+    
+    def get_multi_timeframe_data(self, symbol, timeframes, as_candles=False):
         """
         Get multi-timeframe data with exchange fallback
         timeframes: dict like {'1h': 50, '2h': 100} (timeframe: limit)
+        as_candles=True returns Candles instead of DataFrames
         """
+        to_output = self.ohlcv_to_candles if as_candles else self.ohlcv_to_frame
         data = {}
-        exchange_priority = ['bingx', 'binance', 'okx', 'bybit']
         
         # Find working symbol format
-        working_symbol = None
-        working_exchange = None
+        resolved = self.resolve_coin(symbol)
+        if not resolved:
+            return {}
+        working_exchange, working_symbol = resolved
         
-        for exchange_name in exchange_priority:
-            symbol_format = self.find_symbol_on_exchange(exchange_name, symbol)
-            if symbol_format:
-                working_symbol = symbol_format
-                working_exchange = exchange_name
-                break
+        # Fetch all required timeframes concurrently (ccxt still rate-limits per exchange)
+        with ThreadPoolExecutor(max_workers=len(timeframes)) as executor:
+            futures = {
+                executor.submit(self.fetch_ohlcv_array, working_exchange, working_symbol, timeframe, limit): timeframe
+                for timeframe, limit in timeframes.items()
+            }
+            for future in as_completed(futures):
+                arr = future.result()
+                if arr is not None:
+                    data[futures[future]] = to_output(arr)
         
-        if not working_symbol or not working_exchange:
+        return data
+    
+    def fetch_many_symbols(self, symbols, timeframes, max_workers=8):
+        """
+        Get multi-timeframe data for many symbols with a bounded thread pool
+        Returns {symbol: data} with the same per-symbol shape as get_multi_timeframe_data
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.get_multi_timeframe_data, symbol, timeframes): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Data fetch failed for {symbol}: {str(e)[:50]}")
+                    results[symbol] = {}
+        
+        return results
+    
+    async def get_multi_timeframe_data_async(self, symbol, timeframes, semaphore=None, as_candles=False,
+                                             request_timeout=None):
+        """
+        Coroutine version of get_multi_timeframe_data(); semaphore bounds in-flight requests
+        request_timeout limits each request once it holds a semaphore slot (raises asyncio.TimeoutError),
+        so time spent queued behind other symbols never counts against it
+        """
+        to_output = self.ohlcv_to_candles if as_candles else self.ohlcv_to_frame
+        resolved = self.resolve_coin(symbol)
+        if not resolved:
             return {}
+        working_exchange, working_symbol = resolved
         
-        # Fetch data for all required timeframes
-        for timeframe, limit in timeframes.items():
-            df = self.fetch_ohlcv_with_retry(working_exchange, working_symbol, timeframe, limit)
-            if df is not None:
-                data[timeframe] = df
+        async def fetch(timeframe, limit):
+            if semaphore is None:
+                return await asyncio.wait_for(
+                    self.fetch_ohlcv_array_async(working_exchange, working_symbol, timeframe, limit), request_timeout
+                )
+            async with semaphore:
+                return await asyncio.wait_for(
+                    self.fetch_ohlcv_array_async(working_exchange, working_symbol, timeframe, limit), request_timeout
+                )
         
-        return data
+        arrays = await asyncio.gather(*(fetch(tf, limit) for tf, limit in timeframes.items()))
+        return {
+            timeframe: to_output(arr)
+            for timeframe, arr in zip(timeframes, arrays)
+            if arr is not None
+        }
+    
+    async def fetch_many_symbols_async(self, symbols, timeframes, concurrency=16):
+        """
+        Get multi-timeframe data for many symbols on one event loop
+        Returns {symbol: data} like fetch_many_symbols; async sessions are closed afterwards
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            fetched = await asyncio.gather(
+                *(self.get_multi_timeframe_data_async(symbol, timeframes, semaphore) for symbol in symbols),
+                return_exceptions=True
+            )
+        finally:
+            await self.close_async()
+        
+        results = {}
+        for symbol, data in zip(symbols, fetched):
+            if isinstance(data, Exception):
+                self.logger.warning(f"⚠️ Data fetch failed for {symbol}: {str(data)[:50]}")
+                data = {}
+            results[symbol] = data
+        return results
+    
+    async def close_async(self):
+        """Close the aiohttp sessions held by the async exchange twins"""
+        exchanges, self._async_exchanges = self._async_exchanges, {}
+        for exchange in exchanges.values():
+            try:
+                await exchange.close()
+            except Exception as e:
+                self.logger.warning(f"⚠️ Failed to close async exchange: {str(e)[:50]}")
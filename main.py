@@ -7,23 +7,38 @@ Perfect replication of Pine Script indicator with 2H StochRSI confirmation
 import os
 import sys
 import time
+import asyncio
+import atexit
 import json
 import hashlib
 from datetime import datetime, timedelta
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 import logging
+import numpy as np
 
 # Import custom modules
 from data_manager import CoinGeckoManager, MultiExchangeManager
-from analyzers import TrendPulseAnalyzer, StochRSICalculator, HeikinAshiConverter
-from alert_system import TelegramAlertManager, ChartURLResolver, DeduplicationManager
+from analyzers import TrendPulseAnalyzer, StochRSICalculator, HeikinAshiConverter, SIGNAL_CODES, stochrsi_confirmations
+from alert_system import TelegramAlertManager, ChartURLResolver, DeduplicationManager, attach_dedup_buckets
 from utils import setup_logging, get_ist_time, format_price, format_change
 
+# libuv-backed event loop for the async fan-out where available (Linux/macOS)
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 # Configuration
 EXECUTION_INTERVAL = 300  # 5 minutes in seconds
 COINGECKO_REFRESH_INTERVAL = 1800  # 30 minutes in seconds
-MAX_WORKERS = 4  # Conservative threading
+MAX_WORKERS = 4  # Conservative threading (CPU-bound analysis)
+FETCH_CONCURRENCY = 16  # In-flight exchange requests on the event loop
+FETCH_TIMEOUT = 90  # Seconds one in-flight exchange request may take (queueing for a slot excluded)
+TREND_TIMEFRAMES = {'1h': 50}     # For TrendPulse analysis
+CONFIRM_TIMEFRAMES = {'2h': 100}  # For StochRSI confirmation, fetched only for TrendPulse signals
+TIMEFRAMES = {**TREND_TIMEFRAMES, **CONFIRM_TIMEFRAMES}
 
 # File paths
 BASE_DIR = Path(__file__).parent
@@ -47,122 +62,241 @@ class AdvancedCryptoAnalytics:
         self.logger.info("🚀 Initializing Advanced Crypto Analytics V3.0")
         
         # Initialize core components
-        self.coingecko_manager = CoinGeckoManager(CACHE_DIR)
-        self.exchange_manager = MultiExchangeManager()
+        self.coingecko_manager = CoinGeckoManager(CACHE_DIR, cache_ttl=COINGECKO_REFRESH_INTERVAL)
+        self.exchange_manager = MultiExchangeManager(CACHE_DIR)
         self.trendpulse_analyzer = TrendPulseAnalyzer()
         self.stochrsi_calculator = StochRSICalculator()
         self.heikin_ashi_converter = HeikinAshiConverter()
         self.deduplication_manager = DeduplicationManager(CACHE_DIR)
-        self.chart_resolver = ChartURLResolver(CACHE_DIR)
+        self.chart_resolver = ChartURLResolver()
         self.telegram_manager = TelegramAlertManager()
         
+        # Analysis threads live for the whole process (their numba scratch buffers too)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='analyze')
+        atexit.register(self.executor.shutdown, wait=True)
+        
+        # One event loop for every cycle so the async exchange sessions (and their
+        # keep-alive TLS connections) are reused instead of rebuilt every 5 minutes
+        self.loop = asyncio.new_event_loop()
+        atexit.register(self.close_event_loop)
+        
         # System state
-        self.last_coingecko_refresh = datetime.min
-        self.system_start_time = datetime.utcnow()
+        self.system_start_time = time.monotonic()  # Elapsed-time math only
         self.total_signals_sent = 0
         self.total_cycles_completed = 0
         
         self.logger.info("✅ All components initialized successfully")
 
-    def should_refresh_coingecko(self):
-        """Check if CoinGecko data needs refreshing (every 30 minutes)"""
-        time_since_refresh = datetime.utcnow() - self.last_coingecko_refresh
-        return time_since_refresh.total_seconds() > COINGECKO_REFRESH_INTERVAL
-
     def get_coin_data(self):
-        """Get coin list with smart caching strategy"""
-        if self.should_refresh_coingecko():
-            self.logger.info("🌐 Refreshing CoinGecko coin data (30-minute refresh)")
-            tier_data, api_calls = self.coingecko_manager.get_dual_tier_coins()
-            self.last_coingecko_refresh = datetime.utcnow()
+        """Get coin list; the CoinGecko manager serves it from memory until its TTL expires"""
+        tier_data, api_calls = self.loop.run_until_complete(self.coingecko_manager.get_dual_tier_coins_async())
+        if api_calls:
             self.logger.info(f"✅ CoinGecko refresh complete: {api_calls} API calls used")
-        else:
-            cache_age = (datetime.utcnow() - self.last_coingecko_refresh).total_seconds() / 60
-            self.logger.info(f"🔄 Using cached CoinGecko data (age: {cache_age:.1f} minutes)")
-            tier_data, api_calls = self.coingecko_manager.get_cached_coins()
-        
         return tier_data
 
-    def fetch_market_data(self, symbol):
+    def update_chart_exchanges(self, tier_data):
+        """Refresh the chart resolver's symbol -> exchange map from loaded markets"""
+        symbols = [coin['symbol'] for coin in tier_data['high_risk'] + tier_data['standard']]
+        self.chart_resolver.set_exchange_map(self.exchange_manager.get_chart_exchange_map(symbols))
+
+    def fetch_market_data(self, symbol, timeframes=TIMEFRAMES):
         """Fetch multi-timeframe data with exchange fallback"""
         try:
-            # Get 1H data for TrendPulse and 2H data for StochRSI
-            timeframes = {
-                '1h': 50,   # For TrendPulse analysis
-                '2h': 100   # For StochRSI confirmation
-            }
+            data = self.exchange_manager.get_multi_timeframe_data(symbol, timeframes, as_candles=True)
             
-            data = self.exchange_manager.get_multi_timeframe_data(symbol, timeframes)
+            if not data or any(timeframe not in data for timeframe in timeframes):
+                return None
+                
+            return data
+            
+        except Exception as e:
+            self.logger.error(f"❌ Data fetch error for {symbol}: {str(e)[:50]}")
+            return None
+
+    async def fetch_market_data_async(self, symbol, semaphore, timeframes=TIMEFRAMES):
+        """Coroutine version of fetch_market_data() on the async exchange clients"""
+        try:
+            data = await self.exchange_manager.get_multi_timeframe_data_async(
+                symbol, timeframes, semaphore, as_candles=True, request_timeout=FETCH_TIMEOUT
+            )
             
-            if not data or '1h' not in data or '2h' not in data:
+            if not data or any(timeframe not in data for timeframe in timeframes):
                 return None
                 
             return data
             
+        except asyncio.TimeoutError:
+            raise
         except Exception as e:
             self.logger.error(f"❌ Data fetch error for {symbol}: {str(e)[:50]}")
             return None
 
     def analyze_coin(self, coin, tier_type):
         """Complete coin analysis with TrendPulse + StochRSI confirmation"""
+        symbol = coin['symbol']
+        outcome = self.analyze_trendpulse(coin, tier_type, self.fetch_market_data(symbol, TREND_TIMEFRAMES))
+        if outcome[0] is not None:
+            outcome = self.analyze_stochrsi(outcome[0], self.fetch_market_data(symbol, CONFIRM_TIMEFRAMES))
+        return self.confirm_candidates([outcome])[0]
+
+    async def analyze_coin_async(self, coin, tier_type, semaphore, executor):
+        """
+        1H fetch + TrendPulse first; the 2H fetch and StochRSI run only for TrendPulse signals
+        Network waits stay on the event loop, analysis runs on the executor
+        """
+        symbol = coin['symbol']
+        loop = asyncio.get_running_loop()
+        try:
+            market_data = await self.fetch_market_data_async(symbol, semaphore, TREND_TIMEFRAMES)
+            outcome = await loop.run_in_executor(executor, self.analyze_trendpulse, coin, tier_type, market_data)
+            if outcome[0] is None:
+                return outcome
+            market_data = await self.fetch_market_data_async(symbol, semaphore, CONFIRM_TIMEFRAMES)
+        except asyncio.TimeoutError:
+            # Always logged: sampled progress logging would hide a stuck symbol
+            self.logger.warning(f"⏱️ Fetch timeout: {symbol} after {FETCH_TIMEOUT}s")
+            return None, f"⏱️ Fetch timeout: {symbol}"
+        return await loop.run_in_executor(executor, self.analyze_stochrsi, outcome[0], market_data)
+
+    async def analyze_all_async(self, coins_with_tiers):
+        """
+        Analyze (coin, tier) pairs concurrently; each result is (result, log) or the raised exception,
+        in input order, so one failing coin neither aborts the cycle nor strands its siblings on the loop
+        Coins queue for FETCH_CONCURRENCY slots without a deadline; FETCH_TIMEOUT covers each request once it runs
+        """
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+        return await asyncio.gather(*(
+            self.analyze_coin_async(coin, tier_type, semaphore, self.executor)
+            for coin, tier_type in coins_with_tiers
+        ), return_exceptions=True)
+
+    async def sleep_until_next_cycle(self, sleep_time):
+        """Sleep between cycles; a CoinGecko refresh due before the next cycle runs during the sleep"""
+        if not self.coingecko_manager.cache_expires_within(sleep_time):
+            await asyncio.sleep(sleep_time)
+            return
+        
+        sleep_start = time.monotonic()
+        _, api_calls = await self.coingecko_manager.get_dual_tier_coins_async(force=True)
+        if api_calls:
+            self.logger.info(f"✅ CoinGecko refreshed ahead of next cycle: {api_calls} API calls used")
+        await asyncio.sleep(max(0, sleep_time - (time.monotonic() - sleep_start)))
+
+    def close_event_loop(self):
+        """Close the async exchange and Telegram sessions and the cycle event loop"""
+        if self.loop.is_closed():
+            return
+        try:
+            self.loop.run_until_complete(self.exchange_manager.close_async())
+            self.loop.run_until_complete(self.telegram_manager.close_async())
+        finally:
+            self.loop.close()
+
+    def analyze_trendpulse(self, coin, tier_type, market_data):
+        """
+        1H Heikin Ashi + TrendPulse on already-fetched market data
+        Returns (candidate, None) for a TrendPulse signal (StochRSI still pending), else (None, log)
+        """
         try:
             symbol = coin['symbol']
             
-            # Fetch market data
-            market_data = self.fetch_market_data(symbol)
             if not market_data:
                 return None, f"❌ No data: {symbol}"
             
             # Convert 1H data to Heikin Ashi
-            ha_df = self.heikin_ashi_converter.convert(market_data['1h'])
-            if ha_df is None:
+            ha = self.heikin_ashi_converter.convert_candles(market_data['1h'], state_key=(symbol, '1h'))
+            if ha is None:
                 return None, f"❌ HA conversion failed: {symbol}"
             
             # TrendPulse analysis on 1H Heikin Ashi
-            trendpulse_signal = self.trendpulse_analyzer.analyze(ha_df, tier_type)
+            trendpulse_signal = self.trendpulse_analyzer.analyze_candles(ha, tier_type, state_key=(symbol, '1h'))
             if not trendpulse_signal or not trendpulse_signal['has_signal']:
                 return None, f"📊 No TrendPulse signal: {symbol}"
             
-            # StochRSI confirmation on 2H
-            stochrsi_data = self.stochrsi_calculator.calculate(market_data['2h'])
+            return {
+                'coin': coin,
+                'tier': tier_type,
+                'trendpulse_signal': trendpulse_signal,
+                'ha': ha
+            }, None
+            
+        except Exception as e:
+            return None, f"❌ Analysis error {symbol}: {str(e)[:50]}"
+
+    def analyze_stochrsi(self, candidate, market_data):
+        """
+        2H StochRSI for a TrendPulse candidate
+        Returns (candidate with K/D, None) awaiting confirm_candidates, else (None, log)
+        """
+        try:
+            symbol = candidate['coin']['symbol']
+            
+            if not market_data:
+                return None, f"❌ No data: {symbol}"
+            
+            # StochRSI on 2H - confirmation itself is applied across all candidates at once
+            stochrsi_data = self.stochrsi_calculator.calculate_candles(market_data['2h'], state_key=(symbol, '2h'))
             if not stochrsi_data:
                 return None, f"❌ StochRSI calculation failed: {symbol}"
             
-            # Apply confirmation logic
-            signal_type = trendpulse_signal['signal_type']
-            k_value = stochrsi_data['current_k']
-            d_value = stochrsi_data['current_d']
+            return {
+                **candidate,
+                'k': stochrsi_data['current_k'],
+                'd': stochrsi_data['current_d']
+            }, None
+            
+        except Exception as e:
+            return None, f"❌ Analysis error {symbol}: {str(e)[:50]}"
+
+    def confirm_candidates(self, outcomes):
+        """
+        Apply the StochRSI confirmation to every candidate in one vectorized pass
+        Maps analyze_trendpulse / analyze_stochrsi outcomes to (result, log) pairs in the same order;
+        exception outcomes from analyze_all_async pass through unchanged
+        """
+        positions = [
+            i for i, outcome in enumerate(outcomes)
+            if not isinstance(outcome, BaseException) and outcome[0] is not None
+        ]
+        if not positions:
+            return outcomes
+        
+        candidates = [outcomes[i][0] for i in positions]
+        signal_codes = np.array([SIGNAL_CODES.get(c['trendpulse_signal']['signal_type'], 0) for c in candidates], dtype=np.int8)
+        k_values = np.array([c['k'] for c in candidates], dtype=np.float64)
+        d_values = np.array([c['d'] for c in candidates], dtype=np.float64)
+        # BUY: StochRSI must be oversold (< 20); SELL: overbought (> 80)
+        confirmed = stochrsi_confirmations(signal_codes, k_values, d_values)
+        
+        outcomes = list(outcomes)
+        for pos, (c, is_confirmed) in enumerate(zip(candidates, confirmed)):
+            symbol = c['coin']['symbol']
+            k_value, d_value = c['k'], c['d']
             
-            confirmed = False
-            if signal_type == 'BUY':
-                # BUY: StochRSI must be oversold (< 20)
-                confirmed = k_value < 20 and d_value < 20
-                confirmation_reason = f"StochRSI_2H_Oversold(K:{k_value:.1f},D:{d_value:.1f})"
-            elif signal_type == 'SELL':
-                # SELL: StochRSI must be overbought (> 80)
-                confirmed = k_value > 80 and d_value > 80
-                confirmation_reason = f"StochRSI_2H_Overbought(K:{k_value:.1f},D:{d_value:.1f})"
+            if not is_confirmed:
+                outcomes[positions[pos]] = (None, f"📊 No StochRSI confirmation: {symbol} (K:{k_value:.1f},D:{d_value:.1f})")
+                continue
             
-            if not confirmed:
-                return None, f"📊 No StochRSI confirmation: {symbol} (K:{k_value:.1f},D:{d_value:.1f})"
+            signal_type = c['trendpulse_signal']['signal_type']
+            zone = 'Oversold' if signal_type == 'BUY' else 'Overbought'
+            confirmation_reason = f"StochRSI_2H_{zone}(K:{k_value:.1f},D:{d_value:.1f})"
             
-            # Create confirmed signal
-            confirmed_signal = {
-                **trendpulse_signal,
+            # Create confirmed signal (dedup buckets rounded once, here)
+            confirmed_signal = attach_dedup_buckets({
+                **c['trendpulse_signal'],
                 'stoch_rsi_k': k_value,
                 'stoch_rsi_d': d_value,
                 'confirmation_reason': confirmation_reason,
-                'candle_timestamp': ha_df.index[-2]
-            }
+                'candle_timestamp': c['ha'].timestamp(-2)
+            })
             
-            return {
-                'coin': coin,
+            outcomes[positions[pos]] = ({
+                'coin': c['coin'],
                 'signal': confirmed_signal,
-                'tier': tier_type
-            }, f"✅ CONFIRMED {signal_type}: {symbol} ({confirmation_reason})"
-            
-        except Exception as e:
-            return None, f"❌ Analysis error {symbol}: {str(e)[:50]}"
+                'tier': c['tier']
+            }, f"✅ CONFIRMED {signal_type}: {symbol} ({confirmation_reason})")
+        
+        return outcomes
 
     def process_signals(self, results):
         """Process confirmed signals with deduplication and alerting"""
@@ -170,14 +304,15 @@ class AdvancedCryptoAnalytics:
         
         self.logger.info(f"🚨 Processing {len(results)} confirmed signals")
         
+        pending = []
         for result in results:
             try:
                 coin = result['coin']
                 signal = result['signal']
                 tier_type = result['tier']
                 
-                # Check deduplication
-                if self.deduplication_manager.is_duplicate(coin, signal):
+                # Check deduplication and reserve the signal in one key computation
+                if self.deduplication_manager.check_and_mark(coin, signal):
                     self.logger.info(f"🔄 Duplicate prevented: {coin['symbol']} {signal['signal_type']}")
                     continue
                 
@@ -186,33 +321,36 @@ class AdvancedCryptoAnalytics:
                 signal['chart_url'] = chart_url
                 signal['chart_exchange'] = exchange
                 
-                # Send alert
-                success = self.telegram_manager.send_alert(coin, signal, tier_type)
-                if success:
-                    # Mark as sent in deduplication cache
-                    self.deduplication_manager.mark_sent(coin, signal)
-                    alerts_sent += 1
-                    
-                    self.logger.info(f"✅ Alert sent: {coin['symbol']} {signal['signal_type']} @ {format_price(coin['current_price'])}")
-                    
-                    # Add 30-second global cooldown between alerts
-                    if alerts_sent < len(results):
-                        time.sleep(30)
+                pending.append((coin, signal, tier_type))
                 
             except Exception as e:
                 self.logger.error(f"❌ Alert processing error: {str(e)[:80]}")
                 continue
         
+        # Send all alerts concurrently (rate-limited inside the alert manager) on the persistent
+        # loop, so the Telegram session's keep-alive connections carry over between cycles
+        outcomes = self.loop.run_until_complete(self.telegram_manager.send_alerts_batch_async(pending))
+        
+        for (coin, signal, tier_type), success in zip(pending, outcomes):
+            if not success:
+                # Release the reservation so the signal can be retried next cycle
+                self.deduplication_manager.unmark(coin, signal)
+            else:
+                alerts_sent += 1
+                self.logger.info(f"✅ Alert sent: {coin['symbol']} {signal['signal_type']} @ {format_price(coin['current_price'])}")
+        
         return alerts_sent
 
     def execute_analysis_cycle(self):
         """Execute complete analysis cycle"""
-        cycle_start = datetime.utcnow()
+        cycle_start = time.monotonic()
         self.logger.info("🔄 Starting analysis cycle")
+        self.deduplication_manager.start_cycle()
         
         try:
             # Get coin data
             tier_data = self.get_coin_data()
+            self.update_chart_exchanges(tier_data)
             high_risk_coins = tier_data['high_risk']
             standard_coins = tier_data['standard']
             
@@ -221,35 +359,25 @@ class AdvancedCryptoAnalytics:
             
             all_results = []
             
-            # Parallel processing with conservative thread count
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                # Submit HIGH RISK coins
-                high_risk_futures = [
-                    executor.submit(self.analyze_coin, coin, 'HIGH_RISK')
-                    for coin in high_risk_coins
-                ]
-                
-                # Submit STANDARD coins
-                standard_futures = [
-                    executor.submit(self.analyze_coin, coin, 'STANDARD')
-                    for coin in standard_coins
-                ]
-                
-                # Collect HIGH RISK results
-                self.logger.info("🔥 Processing HIGH RISK tier (1H HA + 2H StochRSI)")
-                for i, future in enumerate(high_risk_futures, 1):
-                    result, log = future.result()
-                    if i <= 5 or i % 20 == 0 or result:  # Log first 5, every 20th, and all signals
-                        self.logger.info(f"[{i}/{len(high_risk_futures)}] {log}")
-                    if result:
-                        all_results.append(result)
-                
-                # Collect STANDARD results
-                self.logger.info("📊 Processing STANDARD tier (1H HA + 2H StochRSI)")
-                for i, future in enumerate(standard_futures, 1):
-                    result, log = future.result()
+            # Fetch concurrently on one event loop; analysis runs on a small thread pool
+            outcomes = self.confirm_candidates(self.loop.run_until_complete(self.analyze_all_async(
+                [(coin, 'HIGH_RISK') for coin in high_risk_coins] +
+                [(coin, 'STANDARD') for coin in standard_coins]
+            )))
+            tier_outcomes = (
+                ("🔥 Processing HIGH RISK tier (1H HA + 2H StochRSI)", outcomes[:len(high_risk_coins)]),
+                ("📊 Processing STANDARD tier (1H HA + 2H StochRSI)", outcomes[len(high_risk_coins):])
+            )
+            
+            for header, tier_results in tier_outcomes:
+                self.logger.info(header)
+                for i, outcome in enumerate(tier_results, 1):
+                    if isinstance(outcome, BaseException):
+                        self.logger.error(f"[{i}/{len(tier_results)}] ❌ Analysis error: {str(outcome)[:50]}")
+                        continue
+                    result, log = outcome
                     if i <= 5 or i % 20 == 0 or result:  # Log first 5, every 20th, and all signals
-                        self.logger.info(f"[{i}/{len(standard_futures)}] {log}")
+                        self.logger.info(f"[{i}/{len(tier_results)}] {log}")
                     if result:
                         all_results.append(result)
             
@@ -260,7 +388,7 @@ class AdvancedCryptoAnalytics:
             self.total_signals_sent += alerts_sent
             self.total_cycles_completed += 1
             
-            cycle_duration = (datetime.utcnow() - cycle_start).total_seconds()
+            cycle_duration = time.monotonic() - cycle_start
             
             self.logger.info(f"🎉 Cycle complete: {alerts_sent} alerts sent in {cycle_duration:.1f}s")
             
@@ -272,8 +400,7 @@ class AdvancedCryptoAnalytics:
 
     def print_system_stats(self):
         """Print comprehensive system statistics"""
-        uptime = datetime.utcnow() - self.system_start_time
-        uptime_hours = uptime.total_seconds() / 3600
+        uptime_hours = (time.monotonic() - self.system_start_time) / 3600
         
         print(f"\n🎉 ADVANCED CRYPTO ANALYTICS V3.0 - SYSTEM STATISTICS")
         print("=" * 80)
@@ -300,7 +427,7 @@ class AdvancedCryptoAnalytics:
         
         try:
             while True:
-                cycle_start = datetime.utcnow()
+                cycle_start = time.monotonic()
                 
                 # Execute analysis cycle
                 alerts_sent, cycle_duration = self.execute_analysis_cycle()
@@ -310,12 +437,12 @@ class AdvancedCryptoAnalytics:
                     self.print_system_stats()
                 
                 # Calculate sleep time
-                elapsed = (datetime.utcnow() - cycle_start).total_seconds()
+                elapsed = time.monotonic() - cycle_start
                 sleep_time = max(0, EXECUTION_INTERVAL - elapsed)
                 
                 if sleep_time > 0:
                     self.logger.info(f"😴 Sleeping for {sleep_time:.1f}s until next cycle")
-                    time.sleep(sleep_time)
+                    self.loop.run_until_complete(self.sleep_until_next_cycle(sleep_time))
                 else:
                     self.logger.warning(f"⚠️ Cycle took {elapsed:.1f}s (longer than {EXECUTION_INTERVAL}s interval)")
                 
@@ -8,17 +8,32 @@ All methods properly defined with blocked coins support
 import os
 import sys
 import time
+import asyncio
+import atexit
 from datetime import datetime
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 import logging
+import numpy as np
 
 from data_manager import CoinGeckoManager, MultiExchangeManager
-from analyzers import TrendPulseAnalyzer, StochRSICalculator, HeikinAshiConverter
-from alert_system import TelegramAlertManager, ChartURLResolver, DeduplicationManager
+from analyzers import TrendPulseAnalyzer, StochRSICalculator, HeikinAshiConverter, stochrsi_confirmations
+from alert_system import TelegramAlertManager, ChartURLResolver, DeduplicationManager, attach_dedup_buckets
 from utils import setup_logging, format_price, load_blocked_coins
 
-MAX_WORKERS = 2
+# libuv-backed event loop for the async fan-out where available (Linux/macOS)
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+MAX_WORKERS = 2  # CPU-bound analysis threads
+FETCH_CONCURRENCY = 16  # In-flight exchange requests on the event loop
+FETCH_TIMEOUT = 30  # Seconds one in-flight exchange request may take (queueing for a slot excluded)
+TREND_TIMEFRAMES = {'1h': 50}     # TrendPulse
+CONFIRM_TIMEFRAMES = {'2h': 100}  # StochRSI, fetched only for TrendPulse signals
+TIMEFRAMES = {**TREND_TIMEFRAMES, **CONFIRM_TIMEFRAMES}
 BASE_DIR = Path(__file__).parent
 CACHE_DIR = BASE_DIR / "cache"
 LOGS_DIR = BASE_DIR / "logs"
@@ -36,15 +51,19 @@ class GitHubActionsAnalytics:
         
         # Initialize components
         self.coingecko = CoinGeckoManager(CACHE_DIR)
-        self.exchange = MultiExchangeManager()
+        self.exchange = MultiExchangeManager(CACHE_DIR)
         self.trendpulse = TrendPulseAnalyzer()
         self.stochrsi = StochRSICalculator()
         self.heikin_ashi = HeikinAshiConverter()
         self.deduplication = DeduplicationManager(CACHE_DIR)
-        self.chart_resolver = ChartURLResolver(CACHE_DIR)
+        self.chart_resolver = ChartURLResolver()
         self.telegram = TelegramAlertManager()
         
-        self.start_time = datetime.utcnow()
+        # Analysis threads live for the whole process (their numba scratch buffers too)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='analyze')
+        atexit.register(self.executor.shutdown, wait=True)
+        
+        self.start_time = time.monotonic()  # Elapsed-time math only
         self.total_signals = 0
         self.total_alerts = 0
 
@@ -55,98 +74,177 @@ class GitHubActionsAnalytics:
             data, calls = self.coingecko.get_dual_tier_coins()
             total = len(data['high_risk']) + len(data['standard'])
             self.logger.info(f"✅ Got {total} coins ({calls} API calls)")
-            return data
         except Exception as e:
             self.logger.error(f"❌ CoinGecko error: {e}")
             # Try cached data as fallback
             data, _ = self.coingecko.get_cached_coins()
-            return data
+        
+        symbols = [coin['symbol'] for coin in data['high_risk'] + data['standard']]
+        self.chart_resolver.set_exchange_map(self.exchange.get_chart_exchange_map(symbols))
+        return data
 
-    def fetch_market_data(self, symbol):
+    def fetch_market_data(self, symbol, timeframes=TIMEFRAMES):
         """Fetch multi-timeframe market data"""
-        timeframes = {'1h': 50, '2h': 100}
-        return self.exchange.get_multi_timeframe_data(symbol, timeframes)
+        return self.exchange.get_multi_timeframe_data(symbol, timeframes, as_candles=True)
 
     def analyze_coin(self, coin, tier):
         """Complete coin analysis with blocked coins check"""
+        if coin['symbol'] in self.blocked_coins:
+            return None, f"🚫 BLOCKED: {coin['symbol']}"
+        outcome = self.analyze_data(coin, tier, self.fetch_market_data(coin['symbol'], TREND_TIMEFRAMES))
+        if outcome[0] is not None:
+            outcome = self.analyze_stoch(outcome[0], self.fetch_market_data(coin['symbol'], CONFIRM_TIMEFRAMES))
+        return self.confirm_candidates([outcome])[0]
+
+    async def analyze_coin_async(self, coin, tier, semaphore, executor):
+        """1H fetch + TrendPulse first; the 2H fetch and StochRSI run only for TrendPulse signals"""
+        symbol = coin['symbol']
+        loop = asyncio.get_running_loop()
+        try:
+            data = await self.exchange.get_multi_timeframe_data_async(
+                symbol, TREND_TIMEFRAMES, semaphore, as_candles=True, request_timeout=FETCH_TIMEOUT
+            )
+            outcome = await loop.run_in_executor(executor, self.analyze_data, coin, tier, data)
+            if outcome[0] is None:
+                return outcome
+            data = await self.exchange.get_multi_timeframe_data_async(
+                symbol, CONFIRM_TIMEFRAMES, semaphore, as_candles=True, request_timeout=FETCH_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            # Always logged: sampled progress logging would hide a stuck symbol
+            self.logger.warning(f"⏱️ Timeout: {symbol} after {FETCH_TIMEOUT}s")
+            return None, f"⏱️ Timeout: {symbol}"
+        return await loop.run_in_executor(executor, self.analyze_stoch, outcome[0], data)
+
+    async def analyze_all_async(self, coins_with_tiers):
+        """
+        Analyze (coin, tier) pairs concurrently; each result is (result, log) or the raised exception
+        Coins queue for FETCH_CONCURRENCY slots without a deadline; FETCH_TIMEOUT covers each request once it runs
+        """
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+        try:
+            return await asyncio.gather(*(
+                self.analyze_coin_async(coin, tier, semaphore, self.executor)
+                for coin, tier in coins_with_tiers
+            ), return_exceptions=True)
+        finally:
+            await self.exchange.close_async()
+
+    def analyze_data(self, coin, tier, data):
+        """
+        1H Heikin Ashi + TrendPulse on already-fetched market data
+        Returns (candidate, None) for a TrendPulse signal (StochRSI still pending), else (None, log)
+        """
         try:
             symbol = coin['symbol']
             
-            # Check blocked coins
-            if symbol.upper() in self.blocked_coins:
-                return None, f"🚫 BLOCKED: {symbol}"
-            
-            # Get market data
-            data = self.fetch_market_data(symbol)
-            if not data or '1h' not in data or '2h' not in data:
+            if not data or '1h' not in data:
                 return None, f"❌ No data: {symbol}"
             
             # Convert to Heikin Ashi
-            ha_df = self.heikin_ashi.convert(data['1h'])
-            if ha_df is None:
+            ha = self.heikin_ashi.convert_candles(data['1h'], state_key=(symbol, '1h'))
+            if ha is None:
                 return None, f"❌ HA failed: {symbol}"
             
             # TrendPulse analysis
-            tp_signal = self.trendpulse.analyze(ha_df, tier)
+            tp_signal = self.trendpulse.analyze_candles(ha, tier, state_key=(symbol, '1h'))
             if not tp_signal['has_signal']:
                 return None, f"📊 No TrendPulse: {symbol}"
             
-            # StochRSI confirmation
-            stoch = self.stochrsi.calculate(data['2h'])
+            return {
+                'coin': coin,
+                'tier': tier,
+                'tp_signal': tp_signal,
+                'ha': ha
+            }, None
+            
+        except Exception as e:
+            return None, f"❌ Error {symbol}: {str(e)[:50]}"
+
+    def analyze_stoch(self, candidate, data):
+        """2H StochRSI for a TrendPulse candidate; confirmation runs over all candidates in confirm_candidates"""
+        try:
+            symbol = candidate['coin']['symbol']
+            
+            if not data or '2h' not in data:
+                return None, f"❌ No data: {symbol}"
+            
+            stoch = self.stochrsi.calculate_candles(data['2h'], state_key=(symbol, '2h'))
             if not stoch:
                 return None, f"❌ StochRSI failed: {symbol}"
-
-            # Apply confirmation logic  
-            signal_type = tp_signal['signal_type']
-            k, d = stoch['current_k'], stoch['current_d']
-            
-            # FIXED: Handle both 0-1 and 0-100 scales
-            k_scaled = k * 100 if k <= 1 else k
-            d_scaled = d * 100 if d <= 1 else d
-            
-            if signal_type == 'BUY':
-                confirmed = k_scaled < 20 and d_scaled < 20
-                reason = f"StochRSI_2H_Oversold(K:{k_scaled:.1f},D:{d_scaled:.1f})"
-            else:  # SELL
-                confirmed = k_scaled > 80 and d_scaled > 80
-                reason = f"StochRSI_2H_Overbought(K:{k_scaled:.1f},D:{d_scaled:.1f})"
-            
-            if not confirmed:
-                return None, f"📊 No StochRSI confirmation: {symbol} - {reason}"
-            
-            # Create confirmed signal
-            signal = {
-                **tp_signal,
-                'stoch_rsi_k': k_scaled,  # Use scaled values
-                'stoch_rsi_d': d_scaled,
-                'confirmation_reason': reason,
-                'candle_timestamp': ha_df.index[-2],
-                'github_run_time': datetime.utcnow().isoformat()
-            }
             
             return {
-                'coin': coin,
-                'signal': signal,
-                'tier': tier
-            }, f"✅ CONFIRMED {signal_type}: {symbol} ({reason})"
-
+                **candidate,
+                'k': stoch['current_k'],
+                'd': stoch['current_d']
+            }, None
             
         except Exception as e:
             return None, f"❌ Error {symbol}: {str(e)[:50]}"
 
+    def confirm_candidates(self, outcomes):
+        """Vectorized StochRSI confirmation; maps analyze_data / analyze_stoch outcomes to (result, log) in order"""
+        positions = [
+            i for i, outcome in enumerate(outcomes)
+            if isinstance(outcome, tuple) and outcome[0] is not None
+        ]
+        if not positions:
+            return outcomes
+        
+        candidates = [outcomes[i][0] for i in positions]
+        k = np.array([c['k'] for c in candidates], dtype=np.float64)
+        d = np.array([c['d'] for c in candidates], dtype=np.float64)
+        # FIXED: Handle both 0-1 and 0-100 scales
+        k_scaled = np.where(k <= 1, k * 100, k)
+        d_scaled = np.where(d <= 1, d * 100, d)
+        signal_codes = np.array([1 if c['tp_signal']['signal_type'] == 'BUY' else -1 for c in candidates], dtype=np.int8)
+        confirmed = stochrsi_confirmations(signal_codes, k_scaled, d_scaled)
+        
+        outcomes = list(outcomes)
+        run_time = datetime.utcnow().isoformat()
+        for pos, (c, is_confirmed) in enumerate(zip(candidates, confirmed)):
+            symbol = c['coin']['symbol']
+            signal_type = c['tp_signal']['signal_type']
+            k_value, d_value = float(k_scaled[pos]), float(d_scaled[pos])
+            zone = 'Oversold' if signal_type == 'BUY' else 'Overbought'
+            reason = f"StochRSI_2H_{zone}(K:{k_value:.1f},D:{d_value:.1f})"
+            
+            if not is_confirmed:
+                outcomes[positions[pos]] = (None, f"📊 No StochRSI confirmation: {symbol} - {reason}")
+                continue
+            
+            # Create confirmed signal (dedup buckets rounded once, here)
+            signal = attach_dedup_buckets({
+                **c['tp_signal'],
+                'stoch_rsi_k': k_value,  # Use scaled values
+                'stoch_rsi_d': d_value,
+                'confirmation_reason': reason,
+                'candle_timestamp': c['ha'].timestamp(-2),
+                'github_run_time': run_time
+            })
+            
+            outcomes[positions[pos]] = ({
+                'coin': c['coin'],
+                'signal': signal,
+                'tier': c['tier']
+            }, f"✅ CONFIRMED {signal_type}: {symbol} ({reason})")
+        
+        return outcomes
+
     def process_signals(self, results):
         """Process and send alerts for confirmed signals"""
         sent = 0
         self.logger.info(f"🚨 Processing {len(results)} signals")
         
+        pending = []
         for result in results:
             try:
                 coin = result['coin']
                 signal = result['signal']
                 tier = result['tier']
                 
-                # Check for duplicates
-                if self.deduplication.is_duplicate(coin, signal):
+                # Check for duplicates and reserve the signal in one key computation
+                if self.deduplication.check_and_mark(coin, signal):
                     self.logger.info(f"🔄 Duplicate prevented: {coin['symbol']}")
                     continue
                 
@@ -155,32 +253,39 @@ class GitHubActionsAnalytics:
                 signal['chart_url'] = chart_url
                 signal['chart_exchange'] = exchange
                 
-                # Send alert
-                if self.telegram.send_alert(coin, signal, tier):
-                    self.deduplication.mark_sent(coin, signal)
-                    sent += 1
-                    price = format_price(coin['current_price'])
-                    self.logger.info(f"✅ Alert sent: {coin['symbol']} {signal['signal_type']} @ {price}")
-                    
-                    # Cooldown between alerts
-                    if sent < len(results):
-                        time.sleep(10)
+                pending.append((coin, signal, tier))
                         
             except Exception as e:
                 self.logger.error(f"❌ Alert error: {str(e)[:50]}")
                 continue
         
+        # Send alerts concurrently
+        for (coin, signal, tier), success in zip(pending, self.telegram.send_alerts_batch(pending)):
+            if not success:
+                self.deduplication.unmark(coin, signal)
+            else:
+                sent += 1
+                price = format_price(coin['current_price'])
+                self.logger.info(f"✅ Alert sent: {coin['symbol']} {signal['signal_type']} @ {price}")
+        
         return sent
 
     def run(self):
         """Main execution method - FIXED"""
         try:
             self.logger.info("🔄 Starting scheduled analysis")
+            self.deduplication.start_cycle()
             
             # Get coin data - FIXED METHOD CALL
             coin_data = self.get_coins()
-            high_risk = coin_data['high_risk']
-            standard = coin_data['standard']
+            
+            # Drop blocked coins before any task is created (symbols are upper-cased at ingestion)
+            blocked = self.blocked_coins
+            high_risk = [coin for coin in coin_data['high_risk'] if coin['symbol'] not in blocked]
+            standard = [coin for coin in coin_data['standard'] if coin['symbol'] not in blocked]
+            skipped = len(coin_data['high_risk']) + len(coin_data['standard']) - len(high_risk) - len(standard)
+            if skipped:
+                self.logger.info(f"🚫 Skipped {skipped} blocked coins")
             
             if not high_risk and not standard:
                 self.logger.warning("⚠️ No coins to analyze")
@@ -190,30 +295,28 @@ class GitHubActionsAnalytics:
             
             results = []
             
-            # Parallel analysis
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                # Submit all coins
-                futures = []
-                futures.extend([executor.submit(self.analyze_coin, coin, 'HIGH_RISK') for coin in high_risk])
-                futures.extend([executor.submit(self.analyze_coin, coin, 'STANDARD') for coin in standard])
-                
-                # Collect results with timeout protection
-                for i, future in enumerate(futures, 1):
-                    try:
-                        result, log = future.result(timeout=30)
-                        if i <= 5 or i % 20 == 0 or result:  # Log first 5, every 20th, and all signals
-                            self.logger.info(f"[{i}/{len(futures)}] {log}")
-                        if result:
-                            results.append(result)
-                    except Exception as e:
-                        if i <= 5:  # Only log first few timeouts
-                            self.logger.error(f"[{i}/{len(futures)}] Timeout: {str(e)[:30]}")
+            # Fetch concurrently on one event loop; analysis runs on a small thread pool
+            outcomes = self.confirm_candidates(asyncio.run(self.analyze_all_async(
+                [(coin, 'HIGH_RISK') for coin in high_risk] +
+                [(coin, 'STANDARD') for coin in standard]
+            )))
+            
+            for i, outcome in enumerate(outcomes, 1):
+                if isinstance(outcome, BaseException):
+                    if i <= 5:  # Only log first few failures
+                        self.logger.error(f"[{i}/{len(outcomes)}] Error: {str(outcome)[:30]}")
+                    continue
+                result, log = outcome
+                if i <= 5 or i % 20 == 0 or result:  # Log first 5, every 20th, and all signals
+                    self.logger.info(f"[{i}/{len(outcomes)}] {log}")
+                if result:
+                    results.append(result)
             
             # Send alerts
             self.total_signals = len(results)
             self.total_alerts = self.process_signals(results)
             
-            duration = (datetime.utcnow() - self.start_time).total_seconds()
+            duration = time.monotonic() - self.start_time
             self.logger.info(f"🎉 Complete: {self.total_alerts} alerts in {duration:.1f}s")
             
             return self.total_alerts
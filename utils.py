@@ -1,12 +1,35 @@
 """
 UTILS MODULE - Logging, Time, Formatting & Configuration
 Common utilities used across the entire system
+
+Expensive log messages go through log_if(logger, level, msg_fn, *args):
+msg_fn(*args) is only called when the logger is enabled for that level
 """
 
 import logging
+import logging.handlers
 import os
+import queue
+import sys
+import time
+import atexit
+from bisect import bisect_right
+from collections import defaultdict, deque
+from functools import lru_cache
+from math import isnan
+import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
+from types import MappingProxyType
+
+# Shared by the file and console handlers
+_LOG_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Background thread writing queued log records, created by setup_logging()
+_log_listener = None
 
 
 def setup_logging(log_file_path):
@@ -20,84 +43,140 @@ def setup_logging(log_file_path):
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     
-    # Remove existing handlers
+    # Remove existing handlers (and stop a listener from a previous call)
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
     
     # File handler
-    file_handler = logging.FileHandler(log_file_path)
+    file_handler = logging.FileHandler(log_file_path, encoding='utf-8', delay=True)
     file_handler.setLevel(logging.INFO)
     
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    file_handler.setFormatter(_LOG_FORMATTER)
+    console_handler.setFormatter(_LOG_FORMATTER)
+    
+    # The format uses none of the thread/process record fields, so skip collecting them
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
     
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    # Records are queued on the caller's thread; file/console writes happen on the listener thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _log_listener.start()
+    atexit.register(_stop_log_listener)
     
     return logger
 
 
+def _stop_log_listener():
+    """Drain queued log records on shutdown"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def log_if(logger, level, msg_fn, *args):
+    """Log msg_fn(*args) at level, building the message only if the level is enabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg_fn(*args))
+
+
+# IST is UTC+05:30; times are converted as integer nanoseconds since the epoch
+_IST_OFFSET_NS = 19_800 * 1_000_000_000
+_UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=4)
+def _format_ist(ist_minute):
+    """strftime output for one IST minute (minutes since the epoch); get_ist_time() fills in the seconds"""
+    ist = _UNIX_EPOCH + timedelta(minutes=ist_minute)
+    return (
+        ist.strftime('%I:%M %p %d-%m-%Y'),
+        ist.strftime('%A, %d %B %Y'),
+        ist.strftime('%Y-%m-%d %H:%M')
+    )
+
+
 def get_ist_time():
     """Get current IST time in multiple formats"""
-    utc = datetime.utcnow()
-    ist = utc + timedelta(hours=5, minutes=30)
+    ist_us = (time.time_ns() + _IST_OFFSET_NS) // 1000
+    ist_sec = ist_us // 1_000_000
     
-    time_12h = ist.strftime('%I:%M %p %d-%m-%Y')
-    date_str = ist.strftime('%A, %d %B %Y')
-    timestamp = ist.strftime('%Y-%m-%d %H:%M:%S IST')
+    time_12h, date_str, minute_str = _format_ist(ist_sec // 60)
     
     return {
         'time_12h': time_12h,
         'date_str': date_str,
-        'timestamp': timestamp,
-        'datetime': ist
+        'timestamp': f"{minute_str}:{ist_sec % 60:02d} IST",
+        'datetime': _UNIX_EPOCH + timedelta(microseconds=ist_us)
     }
 
 
+# Ascending lower bounds and the format used from each bound upwards (index 0 = below all bounds)
+_PRICE_THRESHOLDS = (0.0001, 0.01, 1, 1000)
+_PRICE_FMTS = ("${:.8f}", "${:.6f}", "${:.4f}", "${:,.2f}", "${:,.0f}")
+
+_UNIT_THRESHOLDS = (1_000, 1_000_000, 1_000_000_000)
+_UNIT_FMTS = (
+    (1, "${:.0f}"),
+    (1_000, "${:.0f}K"),
+    (1_000_000, "${:.0f}M"),
+    (1_000_000_000, "${:.1f}B"),
+)
+
+
+@lru_cache(maxsize=4096)
+def _format_price_value(price):
+    return _PRICE_FMTS[bisect_right(_PRICE_THRESHOLDS, price)].format(price)
+
+
+@lru_cache(maxsize=4096)
+def _format_unit_value(value):
+    if isnan(value):
+        return "$nan"  # bisect would file NaN under the top (B) bucket
+    divisor, fmt = _UNIT_FMTS[bisect_right(_UNIT_THRESHOLDS, value)]
+    return fmt.format(value / divisor)
+
+
 def format_price(price):
     """Format cryptocurrency price with appropriate precision"""
     if price is None:
         return "$0.00"
     
     try:
-        price = float(price)
-        if price >= 1000:
-            return f"${price:,.0f}"
-        elif price >= 1:
-            return f"${price:,.2f}"
-        elif price >= 0.01:
-            return f"${price:.4f}"
-        elif price >= 0.0001:
-            return f"${price:.6f}"
-        else:
-            return f"${price:.8f}"
+        return _format_price_value(float(price))
     except (ValueError, TypeError):
         return "$0.00"
 
 
+@lru_cache(maxsize=2048)
+def _format_change_value(change):
+    if change > 0:
+        return f"📈 +{change:.2f}%"
+    elif change < 0:
+        return f"📉 {change:.2f}%"
+    else:
+        return f"➡️ {change:.2f}%"
+
+
 def format_change(change):
     """Format price change percentage with emoji and color"""
     if change is None:
         return "➡️ 0.00%"
     
     try:
-        change = float(change)
-        if change > 0:
-            return f"📈 +{change:.2f}%"
-        elif change < 0:
-            return f"📉 {change:.2f}%"
-        else:
-            return f"➡️ {change:.2f}%"
+        return _format_change_value(float(change))
     except (ValueError, TypeError):
         return "➡️ 0.00%"
 
@@ -108,15 +187,7 @@ def format_market_cap(market_cap):
         return "Unknown"
     
     try:
-        market_cap = float(market_cap)
-        if market_cap >= 1_000_000_000:
-            return f"${market_cap / 1_000_000_000:.1f}B"
-        elif market_cap >= 1_000_000:
-            return f"${market_cap / 1_000_000:.0f}M"
-        elif market_cap >= 1_000:
-            return f"${market_cap / 1_000:.0f}K"
-        else:
-            return f"${market_cap:.0f}"
+        return _format_unit_value(float(market_cap))
     except (ValueError, TypeError):
         return "Unknown"
 
@@ -127,43 +198,49 @@ def format_volume(volume):
         return "Unknown"
     
     try:
-        volume = float(volume)
-        if volume >= 1_000_000_000:
-            return f"${volume / 1_000_000_000:.1f}B"
-        elif volume >= 1_000_000:
-            return f"${volume / 1_000_000:.0f}M"
-        elif volume >= 1_000:
-            return f"${volume / 1_000:.0f}K"
-        else:
-            return f"${volume:.0f}"
+        return _format_unit_value(float(volume))
     except (ValueError, TypeError):
         return "Unknown"
 
 
+# Environment snapshot taken at import; the process environment does not change while running
+_ENV_CACHE = dict(os.environ)
+
+REQUIRED_ENV_VARS = (
+    'TELEGRAM_BOT_TOKEN',
+    'HIGH_RISK_CHAT_ID',
+    'TELEGRAM_CHAT_ID'
+)
+
+OPTIONAL_ENV_VARS = (
+    'BINGX_API_KEY',
+    'BINGX_SECRET_KEY',
+    'COINGECKO_API_KEY'
+)
+
+
+def get_env(key, default=None):
+    """Look up an environment variable in the import-time snapshot"""
+    return _ENV_CACHE.get(key, default)
+
+
+def reload_env():
+    """Re-snapshot os.environ (e.g. after setting variables in tests)"""
+    _ENV_CACHE.clear()
+    _ENV_CACHE.update(os.environ)
+
+
+# Precision for OHLCV/indicator arrays: float32 halves memory traffic,
+# set INDICATOR_FLOAT64=1 to run the float64 path (e.g. for regression checks)
+# Read once at import: importers bind the dtype then, so reload_env() does not switch it
+INDICATOR_DTYPE = np.float64 if get_env('INDICATOR_FLOAT64', '').lower() in ('1', 'true') else np.float32
+
+
 def validate_environment_variables():
     """Validate that all required environment variables are set"""
-    required_vars = [
-        'TELEGRAM_BOT_TOKEN',
-        'HIGH_RISK_CHAT_ID',
-        'TELEGRAM_CHAT_ID'
-    ]
-    
-    optional_vars = [
-        'BINGX_API_KEY',
-        'BINGX_SECRET_KEY',
-        'COINGECKO_API_KEY'
-    ]
-    
-    missing_required = []
-    missing_optional = []
-    
-    for var in required_vars:
-        if not os.environ.get(var):
-            missing_required.append(var)
-    
-    for var in optional_vars:
-        if not os.environ.get(var):
-            missing_optional.append(var)
+    env = _ENV_CACHE
+    missing_required = [var for var in REQUIRED_ENV_VARS if not env.get(var)]
+    missing_optional = [var for var in OPTIONAL_ENV_VARS if not env.get(var)]
     
     if missing_required:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_required)}")
@@ -175,9 +252,7 @@ def validate_environment_variables():
     return True
 
 
-def create_config_template():
-    """Create a template .env file with all configuration options"""
-    template = """# Advanced Crypto Analytics V3.0 Configuration
+_CONFIG_TEMPLATE = """# Advanced Crypto Analytics V3.0 Configuration
 # Copy this to .env and fill in your values
 
 # REQUIRED: Telegram Bot Configuration
@@ -201,22 +276,18 @@ MAX_CONCURRENT_ANALYSIS=4
 EXECUTION_INTERVAL_SECONDS=300
 COINGECKO_REFRESH_INTERVAL_SECONDS=1800
 DEDUPLICATION_WINDOW_HOURS=12
-"""
-    
+""".encode('utf-8')
+
+
+def create_config_template():
+    """Create a template .env file with all configuration options"""
     config_file = Path("config_template.env")
-    config_file.write_text(template)
+    config_file.write_bytes(_CONFIG_TEMPLATE)
     print(f"📝 Configuration template created: {config_file.absolute()}")
     return config_file
 
 
-def load_blocked_coins(blocked_coins_file=None):
-    """Load blocked coins from file"""
-    if blocked_coins_file is None:
-        blocked_coins_file = Path("blocked_coins.txt")
-    
-    if not blocked_coins_file.exists():
-        # Create template blocked coins file
-        template_content = """# BLOCKED COINS LIST
+_BLOCKED_COINS_TEMPLATE = """# BLOCKED COINS LIST
 # Add one coin symbol per line to exclude from analysis
 # Lines starting with # are comments
 
@@ -233,48 +304,54 @@ def load_blocked_coins(blocked_coins_file=None):
 # Example: Block specific coins
 # DOGE
 # SHIB
-"""
-        blocked_coins_file.write_text(template_content)
+""".encode('utf-8')
+
+
+def load_blocked_coins(blocked_coins_file=None):
+    """Load blocked coins from file as a frozenset of upper-case symbols"""
+    if blocked_coins_file is None:
+        blocked_coins_file = Path("blocked_coins.txt")
+    
+    if not blocked_coins_file.exists():
+        # Create template blocked coins file
+        blocked_coins_file.write_bytes(_BLOCKED_COINS_TEMPLATE)
         print(f"📝 Blocked coins template created: {blocked_coins_file.absolute()}")
-        return set()
+        return frozenset()
     
     try:
-        blocked = set()
-        with open(blocked_coins_file, 'r') as f:
-            for line in f:
-                line = line.strip().upper()
-                if line and not line.startswith('#'):
-                    blocked.add(line)
+        lines = (line.strip().upper() for line in blocked_coins_file.read_text().splitlines())
+        blocked = frozenset(line for line in lines if line and not line.startswith('#'))
         
         print(f"📝 Loaded {len(blocked)} blocked coins from {blocked_coins_file}")
         return blocked
         
     except Exception as e:
         print(f"⚠️ Error loading blocked coins: {e}")
-        return set()
+        return frozenset()
 
 
-def calculate_system_stats(start_time, total_cycles, total_alerts):
-    """Calculate and format system performance statistics"""
-    uptime = datetime.utcnow() - start_time
-    uptime_hours = uptime.total_seconds() / 3600
+def calculate_system_stats(start_monotonic, total_cycles, total_alerts):
+    """
+    Calculate and format system performance statistics
+    start_monotonic is a time.monotonic() reading taken at startup
+    """
+    uptime_seconds = time.monotonic() - start_monotonic
+    uptime_hours = uptime_seconds / 3600.0
     
     stats = {
         'uptime_hours': uptime_hours,
-        'uptime_days': uptime.days,
+        'uptime_days': int(uptime_hours // 24),
         'total_cycles': total_cycles,
         'total_alerts': total_alerts,
         'alerts_per_hour': total_alerts / max(uptime_hours, 0.1),
         'cycles_per_hour': total_cycles / max(uptime_hours, 0.1),
-        'avg_cycle_time': (uptime_hours * 3600) / max(total_cycles, 1)
+        'avg_cycle_time': uptime_seconds / max(total_cycles, 1)
     }
     
     return stats
 
 
-def print_startup_banner():
-    """Print system startup banner"""
-    print("""
+_STARTUP_BANNER = """
 ╔═══════════════════════════════════════════════════════════════════════════════╗
 ║                    🚀 ADVANCED CRYPTO ANALYTICS V3.0 🚀                       ║
 ╠═══════════════════════════════════════════════════════════════════════════════╣
@@ -284,51 +361,72 @@ def print_startup_banner():
 ║  ⚡ 5-minute execution cycle with 30-minute CoinGecko refresh                 ║
 ║  💎 Production-ready with comprehensive error handling                        ║
 ╚═══════════════════════════════════════════════════════════════════════════════╝
-    """)
 
+"""
 
-def print_system_status(stats):
-    """Print comprehensive system status"""
-    print(f"""
+
+def print_startup_banner():
+    """Print system startup banner"""
+    sys.stdout.write(_STARTUP_BANNER)
+
+
+# Field slots are bound once; print_system_status() only substitutes the values
+_STATUS_TEMPLATE = """
 ╔═══════════════════════════════════════════════════════════════════════════════╗
 ║                           📊 SYSTEM STATISTICS                                ║
 ╠═══════════════════════════════════════════════════════════════════════════════╣
-║  ⏱️  System Uptime: {stats['uptime_hours']:.1f} hours ({stats['uptime_days']} days)                    ║
-║  🔄 Cycles Completed: {stats['total_cycles']:<10} ({stats['cycles_per_hour']:.1f}/hour)                  ║
-║  🚨 Total Alerts Sent: {stats['total_alerts']:<8} ({stats['alerts_per_hour']:.1f}/hour)                   ║
-║  ⚡ Avg Cycle Time: {stats['avg_cycle_time']:.1f} seconds                                  ║
+║  ⏱️  System Uptime: {uptime_hours:.1f} hours ({uptime_days} days)                    ║
+║  🔄 Cycles Completed: {total_cycles:<10} ({cycles_per_hour:.1f}/hour)                  ║
+║  🚨 Total Alerts Sent: {total_alerts:<8} ({alerts_per_hour:.1f}/hour)                   ║
+║  ⚡ Avg Cycle Time: {avg_cycle_time:.1f} seconds                                  ║
 ║  🎯 Success Rate: Premium authenticated signals only                          ║
 ║  💾 Cache Status: Multi-layer caching active                                 ║
 ║  📡 API Usage: Optimized for free tier limits                               ║
 ║  ✅ System Status: OPERATIONAL & STABLE                                      ║
 ╚═══════════════════════════════════════════════════════════════════════════════╝
-    """)
+    """.format
+
+
+def print_system_status(stats):
+    """Print comprehensive system status"""
+    print(_STATUS_TEMPLATE(**stats))
 
 
 class PerformanceMonitor:
     """Monitor system performance and health"""
     
+    CYCLE_HISTORY = 100
+    
     def __init__(self):
-        self.start_time = datetime.utcnow()
-        self.cycle_times = []
-        self.api_call_counts = {}
-        self.error_counts = {}
+        self.start_time = datetime.utcnow()  # Wall-clock display only
+        self._start_monotonic = time.monotonic()
+        self.cycle_times = deque(maxlen=self.CYCLE_HISTORY)
+        self._cycle_sum = 0.0
+        self.api_call_counts = defaultdict(int)
+        self.error_counts = defaultdict(int)
         self.alert_counts = {'high_risk': 0, 'standard': 0}
+        self._total_alerts = 0
+        
+        # Read-only live views handed out by get_performance_summary()
+        self._api_calls_view = MappingProxyType(self.api_call_counts)
+        self._errors_view = MappingProxyType(self.error_counts)
+        self._alerts_view = MappingProxyType(self.alert_counts)
     
     def record_cycle_time(self, duration):
         """Record cycle execution time"""
+        # Keep only last CYCLE_HISTORY cycle times; the deque evicts the oldest on append
+        if len(self.cycle_times) == self.CYCLE_HISTORY:
+            self._cycle_sum -= self.cycle_times[0]
         self.cycle_times.append(duration)
-        # Keep only last 100 cycle times
-        if len(self.cycle_times) > 100:
-            self.cycle_times.pop(0)
+        self._cycle_sum += duration
     
     def record_api_call(self, api_name):
         """Record API call for tracking"""
-        self.api_call_counts[api_name] = self.api_call_counts.get(api_name, 0) + 1
+        self.api_call_counts[api_name] += 1
     
     def record_error(self, error_type):
         """Record error for monitoring"""
-        self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
+        self.error_counts[error_type] += 1
     
     def record_alert(self, tier_type):
         """Record alert sent"""
@@ -336,16 +434,20 @@ class PerformanceMonitor:
             self.alert_counts['high_risk'] += 1
         else:
             self.alert_counts['standard'] += 1
-    
-    def get_performance_summary(self):
-        """Get performance summary"""
-        avg_cycle_time = sum(self.cycle_times) / len(self.cycle_times) if self.cycle_times else 0
-        total_alerts = sum(self.alert_counts.values())
+        self._total_alerts += 1
+    
+    def get_performance_summary(self, snapshot=False):
+        """
+        Get performance summary
+        Counters are read-only live views; snapshot=True copies them for point-in-time isolation
+        """
+        avg_cycle_time = self._cycle_sum / len(self.cycle_times) if self.cycle_times else 0
         
         return {
+            'uptime_hours': (time.monotonic() - self._start_monotonic) / 3600.0,
             'avg_cycle_time': avg_cycle_time,
-            'total_alerts': total_alerts,
-            'api_calls': dict(self.api_call_counts),
-            'errors': dict(self.error_counts),
-            'alert_breakdown': dict(self.alert_counts)
+            'total_alerts': self._total_alerts,
+            'api_calls': dict(self.api_call_counts) if snapshot else self._api_calls_view,
+            'errors': dict(self.error_counts) if snapshot else self._errors_view,
+            'alert_breakdown': dict(self.alert_counts) if snapshot else self._alerts_view
         }